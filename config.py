@@ -35,9 +35,13 @@ MAKER_FILL_RATE_THRESHOLD = float(os.getenv("MAKER_FILL_RATE_THRESHOLD", "0.40")
 
 # ── Network ──────────────────────────────────────────────────────────────
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+ORDERBOOK_TTL_MS = int(os.getenv("ORDERBOOK_TTL_MS", "250"))
 
 # ── Audit Log ────────────────────────────────────────────────────────────
-AUDIT_LOG_MAX_FILES = int(os.getenv("AUDIT_LOG_MAX_FILES", "5000"))
+# API responses go to logs/api_responses/, one NDJSON file per hour (M5 cap):
+# keep at most this many hourly files, and at most this many MB in total.
+AUDIT_LOG_MAX_HOURS = int(os.getenv("AUDIT_LOG_MAX_HOURS", "72"))
+AUDIT_LOG_MAX_MB = int(os.getenv("AUDIT_LOG_MAX_MB", "500"))
 
 # ── Validation ───────────────────────────────────────────────────────────
 if not POLYMARKET_API_KEY or not POLYMARKET_API_SECRET or not POLYMARKET_API_PASSPHRASE:
@@ -8,16 +8,38 @@ Production upgrades applied:
   orders on the exchange that are not tracked in strategy.live_orders.
 - The main loop gates strategy execution on oracle.trading_paused so stale or
   zero-price data never reaches the order placement layer.
+- The loop is paced by a drift-free tick_interval schedule but only re-evaluates once a WS feed has
+  pushed new data (oracle.updated / pm_client.book_updated), with an idle
+  heartbeat so time-based exits and the REST fallback still run.
+- Log files are written from a QueueListener thread, off the event loop.
+- Runs on uvloop (libuv) when installed, else the stdlib event loop.
+- The STOP_TRADING kill switch is watched off the hot path (inotify, or a 1 s
+  poll where unavailable) and can also be tripped with SIGUSR1.
 """
 import argparse
 import asyncio
+import atexit
+import heapq
 import logging
 import os
+import queue
+import signal
 import time
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
+import aiohttp
 from rich.logging import RichHandler
 
+try:
+    from asyncinotify import Inotify, Mask
+except ImportError:  # inotify is Linux-only — fall back to polling the stop file
+    Inotify = None
+
+try:
+    import uvloop
+except ImportError:  # optional (no Windows support) — stdlib event loop instead
+    uvloop = None
+
 import config
 from config import CIRCUIT_BREAKER_USD
 from oracle import AsyncOracle
@@ -40,34 +62,173 @@ error_handler = TimedRotatingFileHandler("logs/error.log", when="midnight", back
 error_handler.setLevel(logging.ERROR)
 error_handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
 
+# File writes happen on a listener thread so the event loop never blocks on
+# disk I/O; the console stays inline to keep Rich tracebacks and markup.
+log_queue: queue.Queue = queue.Queue(-1)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setLevel(logging.DEBUG)
+log_listener = QueueListener(log_queue, file_handler, error_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(message)s",
     datefmt="[%X]",
-    handlers=[console_handler, file_handler, error_handler],
+    handlers=[console_handler, queue_handler],
 )
 logger = logging.getLogger("Main")
 
+# No formatter uses caller, thread, process or task fields; skip collecting
+# them (sys._getframe walk etc.) on every LogRecord.
+logging._srcfile = None
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging.logAsyncioTasks = False  # 3.12+; harmless before
+
 STOP_FILE = "./STOP_TRADING"
+STOP_FILE_POLL_SECONDS = 1.0  # fallback cadence when inotify is unavailable
+
+RESOLVER_MAX_CONCURRENCY = 16
+RESOLVE_PROBE_DELAYS = (5.0, 30.0, 120.0)  # seconds between probes; last one repeats
+
+
+# Resolve the stop file's directory once; each check is then a single
+# stat relative to that fd instead of a full path walk.
+_STOP_NAME = os.path.basename(STOP_FILE)
+if hasattr(os, "O_DIRECTORY") and os.stat in os.supports_dir_fd:
+    _STOP_DIR_FD = os.open(os.path.dirname(STOP_FILE) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    atexit.register(os.close, _STOP_DIR_FD)
+else:  # e.g. Windows
+    _STOP_DIR_FD = None
 
 
 def _check_kill_switch() -> bool:
-    return os.path.exists(STOP_FILE)
+    if _STOP_DIR_FD is None:
+        return os.path.exists(STOP_FILE)
+    try:
+        os.stat(_STOP_NAME, dir_fd=_STOP_DIR_FD)
+        return True
+    except FileNotFoundError:
+        return False
+
 
+async def _watch_stop_file(stop_event: asyncio.Event):
+    """Set stop_event once STOP_FILE appears — via inotify when available, else polling."""
+    if Inotify is not None:
+        try:
+            with Inotify() as inotify:
+                inotify.add_watch(os.path.dirname(STOP_FILE) or ".", Mask.CREATE | Mask.MOVED_TO)
+                # Check after the watch is armed so a file created in between isn't missed
+                if not _check_kill_switch():
+                    async for event in inotify:
+                        if event.name is not None and event.name.name == _STOP_NAME:
+                            break
+            stop_event.set()
+            return
+        except OSError as e:  # EMFILE / ENOSPC (watch limit) — the kill switch must keep working
+            logger.warning(f"inotify unavailable ({e}); polling for {STOP_FILE} instead.")
+    while not _check_kill_switch():
+        await asyncio.sleep(STOP_FILE_POLL_SECONDS)
+    stop_event.set()
+
+
+async def _wait_for_feed_update(
+    feeds: list[asyncio.Event], timeout: float, stop_event: asyncio.Event
+):
+    """Block until any feed event (or stop_event) is set or `timeout` elapses.
+
+    Feed events are cleared afterwards; stop_event is left untouched.
+    """
+    if not stop_event.is_set() and not any(e.is_set() for e in feeds):
+        waiters = [asyncio.ensure_future(e.wait()) for e in (*feeds, stop_event)]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+    for e in feeds:
+        e.clear()
+
+
+async def resolver_loop(pm_client, portfolio, resolving_queue, queued: asyncio.Event):
+    """Probe each expired market on its own schedule (5 s after expiry, then
+    30 s, then every 2 min) and sleep until the next probe is due or main()
+    signals `queued` — no wakeups at all while nothing awaits resolution.
+    Probes sit in a min-heap so each wake only touches markets that are due.
+
+    On the first probe a winner inferred from the pre-expiry orderbooks, if
+    any, is booked provisionally; later probes ask Gamma only to confirm it,
+    and a disagreement is corrected via portfolio.confirm_resolution()."""
+    limiter = asyncio.Semaphore(RESOLVER_MAX_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    schedule: list[tuple[float, str, int]] = []  # heap of (next probe loop.time(), slug, probe count)
+    scheduled: set[str] = set()
+    provisional: dict[str, str] = {}  # slug -> locally inferred winner awaiting Gamma
+
+    async def _check(slug: str):
+        async with limiter:
+            return await pm_client.check_resolution(slug)
 
-async def resolver_loop(pm_client, portfolio, resolving_queue):
     while True:
         try:
-            for slug, condition_id in list(resolving_queue.items()):
-                winner = await pm_client.check_resolution(slug)
-                if winner:
-                    portfolio.resolve_market(condition_id, winner)
-                    del resolving_queue[slug]
+            queued.clear()
+            now = loop.time()
+            for slug in resolving_queue:
+                if slug not in scheduled:
+                    scheduled.add(slug)
+                    heapq.heappush(schedule, (now + RESOLVE_PROBE_DELAYS[0], slug, 0))
+
+            due = []
+            while schedule and schedule[0][0] <= now:
+                due.append(heapq.heappop(schedule))
+            checks = []
+            for entry in due:
+                _, slug, probes = entry
+                local = pm_client.local_resolution(slug) if slug not in provisional else None
+                if local:
+                    logger.info(f"🏁 {slug} resolved from the orderbook; awaiting Gamma confirmation.")
+                    portfolio.resolve_market(resolving_queue[slug], local, provisional=True)
+                    provisional[slug] = local
+                    probes = min(probes + 1, len(RESOLVE_PROBE_DELAYS) - 1)
+                    heapq.heappush(schedule, (now + RESOLVE_PROBE_DELAYS[probes], slug, probes))
+                else:
+                    checks.append(entry)
+            if checks:
+                winners = await asyncio.gather(*(_check(slug) for _, slug, _ in checks), return_exceptions=True)
+                for (_, slug, probes), winner in zip(checks, winners):
+                    if isinstance(winner, Exception):
+                        logger.error(f"Resolution check failed for {slug}: {winner}")
+                    elif winner:
+                        # Drop the entry only once resolve_market() has succeeded
+                        if slug in provisional:
+                            portfolio.confirm_resolution(resolving_queue[slug], winner)
+                            del provisional[slug]
+                        else:
+                            portfolio.resolve_market(resolving_queue[slug], winner)
+                        del resolving_queue[slug]
+                        scheduled.discard(slug)
+                        continue
+                    probes += 1
+                    delay = RESOLVE_PROBE_DELAYS[min(probes, len(RESOLVE_PROBE_DELAYS) - 1)]
+                    heapq.heappush(schedule, (loop.time() + delay, slug, probes))
+
+            timeout = max(0.0, schedule[0][0] - loop.time()) if schedule else None
+            try:
+                await asyncio.wait_for(queued.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
         except asyncio.CancelledError:
             break
         except Exception as e:
             logger.error(f"Resolver loop error: {e}")
-        await asyncio.sleep(10)
+            # Anything popped but not re-pushed gets rescheduled on the next pass
+            scheduled = {slug for _, slug, _ in schedule}
+            try:
+                await asyncio.sleep(RESOLVE_PROBE_DELAYS[0])
+            except asyncio.CancelledError:
+                break
 
 
 async def reconciliation_loop(pm_client, strategy, is_dry: bool):
@@ -94,13 +255,19 @@ async def main(mode: str = "dry-run"):
     portfolio = Portfolio()
     metrics = Metrics()
 
+    # One connection pool + DNS cache shared by every HTTP/WS client
+    connector = aiohttp.TCPConnector(
+        limit=100, limit_per_host=30, ttl_dns_cache=300, keepalive_timeout=60,
+    )
+
     try:
-        pm_client = AsyncPMClient()
+        pm_client = AsyncPMClient(connector=connector)
     except Exception as e:
         logger.error(f"Cannot initialize PMClient: {e}")
+        await connector.close()
         return
 
-    oracle = AsyncOracle()
+    oracle = AsyncOracle(connector=connector)
 
     # ── Start WebSocket feeds before the main loop ────────────────────────
     await oracle.start()
@@ -108,17 +275,30 @@ async def main(mode: str = "dry-run"):
     strategy = BTCStrategy(portfolio)
 
     resolving_queue: dict[str, str] = {}
-    resolver_task = asyncio.create_task(resolver_loop(pm_client, portfolio, resolving_queue))
+    resolve_queued = asyncio.Event()
+    resolver_task = asyncio.create_task(
+        resolver_loop(pm_client, portfolio, resolving_queue, resolve_queued)
+    )
     recon_task = asyncio.create_task(reconciliation_loop(pm_client, strategy, is_dry))
 
+    # ── Kill switch: STOP_TRADING file or SIGUSR1 flips stop_event ───────
+    stop_event = asyncio.Event()
+    stop_task = asyncio.create_task(_watch_stop_file(stop_event))
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, stop_event.set)
+    except (NotImplementedError, AttributeError):
+        pass  # no SIGUSR1 / signal handlers on this platform (e.g. Windows)
+
     # Pre-flight: discover the first active market
     active_market = await pm_client.get_active_market()
     if not active_market:
         logger.error("No active market found on startup. Exiting...")
         resolver_task.cancel()
         recon_task.cancel()
+        stop_task.cancel()
         await pm_client.close()
         await oracle.close()
+        await connector.close()
         return
 
     logger.info(
@@ -128,15 +308,34 @@ async def main(mode: str = "dry-run"):
 
     # Subscribe to the orderbook WS for the initial market
     pm_client.start_orderbook_ws([active_market["yes_token"], active_market["no_token"]])
+    if not is_dry:
+        pm_client.prewarm_order_metadata([active_market["yes_token"], active_market["no_token"]])
 
     tick_interval = 0.5
-    last_summary_time = time.time()
+    idle_heartbeat = 2.0  # max seconds without a WS push before re-evaluating anyway
+    feeds = [oracle.updated, pm_client.book_updated]
+    active_expires_at = active_market.get("expires_at", 0)
+    last_summary_time = time.monotonic()
     SUMMARY_INTERVAL = 3600
+    ORACLE_LOG_INTERVAL = 1.0  # seconds between per-tick oracle lines
+    last_oracle_log = 0.0
+    TREND_LOG_INTERVAL = 10.0  # seconds between warm-up / NEUTRAL status lines
+    last_trend_log = 0.0
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
 
     try:
         while True:
-            if _check_kill_switch():
-                logger.error("🛑 [bold red]STOP_TRADING file detected.[/bold red]", extra={"markup": True})
+            # Single pacing site: tick starts are tick_interval apart on a
+            # monotonic schedule, so body time doesn't add drift. A slow tick
+            # or long feed wait re-anchors the schedule instead of bursting.
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_tick = max(next_tick, loop.time()) + tick_interval
+
+            if stop_event.is_set():
+                logger.error("🛑 [bold red]Kill switch triggered (STOP_TRADING / SIGUSR1).[/bold red]", extra={"markup": True})
                 portfolio.cancel_all_pending()
                 if not is_dry:
                     await pm_client.cancel_all_orders_async()
@@ -165,22 +364,31 @@ async def main(mode: str = "dry-run"):
                     if oracle.trading_paused:
                         logger.warning("⏸️  Oracle feeds down — pausing strategy.")
                     metrics.inc("oracle_failures")
-                    await asyncio.sleep(tick_interval)
                     continue
 
+                # One clock read per tick, reused below (monotonic for intervals)
+                wall = time.time()
+                now = time.monotonic()
+
                 # ── Market rollover ───────────────────────────────────────
-                if time.time() >= active_market.get("expires_at", 0):
+                if wall >= active_expires_at:
                     logger.info("Market expired. Appending to resolution queue...")
                     resolving_queue[active_market["slug"]] = active_market["condition_id"]
+                    resolve_queued.set()
 
                     new_market = await pm_client.get_active_market()
                     if new_market:
                         active_market = new_market
+                        active_expires_at = active_market.get("expires_at", 0)
                         strategy.last_sell_prices.clear()
                         # Re-subscribe WS to the new market's tokens
                         pm_client.start_orderbook_ws(
                             [active_market["yes_token"], active_market["no_token"]]
                         )
+                        if not is_dry:
+                            pm_client.prewarm_order_metadata(
+                                [active_market["yes_token"], active_market["no_token"]]
+                            )
                         logger.info(
                             f"🎯 Now Tracking: [bold yellow]{active_market['title']}[/bold yellow]",
                             extra={"markup": True},
@@ -190,23 +398,27 @@ async def main(mode: str = "dry-run"):
                         continue
 
                 # ── Trend ─────────────────────────────────────────────────
-                trend, diff = strategy.get_trend(price)
+                # Sampled on a fixed 0.5 s grid, independent of feed wakeups
+                trend, diff = strategy.get_trend(price, now)
 
                 if trend == "NEUTRAL":
-                    history_len = len(strategy.price_history)
-                    if history_len < config.LONG_EMA_PERIOD:
-                        if history_len % 20 == 0:  # Log every 10 seconds
-                            logger.info(f"⏳ Warming up trend memory: {history_len}/{config.LONG_EMA_PERIOD} ticks collected...")
-                    else:
-                        if history_len % 20 == 0:
-                            logger.info(f"💤 Trend is NEUTRAL (diff < 2.0 bps). Waiting for momentum...")
-                    await asyncio.sleep(tick_interval)
+                    if now - last_trend_log >= TREND_LOG_INTERVAL:
+                        last_trend_log = now
+                        history_len = len(strategy.price_history)
+                        if history_len < config.LONG_EMA_PERIOD:
+                            logger.info("⏳ Warming up trend memory: %d/%d samples collected...", history_len, config.LONG_EMA_PERIOD)
+                        else:
+                            logger.info("💤 Trend is NEUTRAL (diff < 1.2 bps). Waiting for momentum...")
                     continue
 
-                logger.info(
-                    f"🔮 Oracle: [bold cyan]${price:,.2f}[/bold cyan] | Trend: {trend} | Diff: {diff:.2f}",
-                    extra={"markup": True},
-                )
+                # Per-tick line: lazy %-formatting, no Rich markup parsing,
+                # and at most one per ORACLE_LOG_INTERVAL on fast WS pushes
+                if now - last_oracle_log >= ORACLE_LOG_INTERVAL and logger.isEnabledFor(logging.INFO):
+                    last_oracle_log = now
+                    logger.info(
+                        "🔮 Oracle: $%s (%s) | Trend: %s | Diff: %.2f",
+                        f"{price:,.2f}", oracle_res["source"], trend, diff,
+                    )
 
                 target_token = active_market["yes_token"] if trend == "UP" else active_market["no_token"]
                 target_side = "YES (UP)" if trend == "UP" else "NO (DOWN)"
@@ -215,17 +427,18 @@ async def main(mode: str = "dry-run"):
                 book = await pm_client.fetch_orderbook(target_token)
 
                 # ── Strategy ──────────────────────────────────────────────
-                active_market["closes_in"] = max(0, active_market.get("expires_at", 0) - time.time())
+                active_market["closes_in"] = max(0, active_expires_at - wall)
                 await strategy.evaluate_and_execute(
                     pm_client, active_market, oracle_res, book, diff, target_token, target_side,
                 )
 
                 # ── Hourly summary ────────────────────────────────────────
-                if time.time() - last_summary_time > SUMMARY_INTERVAL:
+                if now - last_summary_time > SUMMARY_INTERVAL:
+                    portfolio.flush_trades()
                     path = metrics.write_daily_summary()
                     if path:
                         logger.info(f"📊 Summary written: {path}")
-                    last_summary_time = time.time()
+                    last_summary_time = now
 
             except asyncio.CancelledError:
                 break
@@ -233,20 +446,25 @@ async def main(mode: str = "dry-run"):
                 logger.error(f"Loop Exception: {e}", exc_info=True)
                 metrics.inc("loop_errors")
 
-            await asyncio.sleep(tick_interval)
+            await _wait_for_feed_update(feeds, idle_heartbeat, stop_event)
 
     finally:
         logger.info("Cleaning up…")
+        portfolio.flush_trades()
         path = metrics.write_daily_summary()
         resolver_task.cancel()
         recon_task.cancel()
-        for task in (resolver_task, recon_task):
+        stop_task.cancel()
+        for task in (resolver_task, recon_task, stop_task):
             try:
                 await task
             except asyncio.CancelledError:
                 pass
+            except Exception as e:  # a crashed helper must not skip the closes below
+                logger.error(f"Background task failed: {e}")
         await pm_client.close()
         await oracle.close()
+        await connector.close()
         logger.info("Shutdown complete.")
 
 
@@ -255,7 +473,8 @@ if __name__ == "__main__":
     parser.add_argument("--mode", choices=["dry-run", "staging", "live"], default="dry-run")
     args = parser.parse_args()
 
+    run = uvloop.run if uvloop is not None else asyncio.run
     try:
-        asyncio.run(main(mode=args.mode))
+        run(main(mode=args.mode))
     except KeyboardInterrupt:
         logger.info("Bot interrupted by user.")
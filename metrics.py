@@ -3,7 +3,11 @@ import csv
 import os
 import time
 from collections import Counter
-from decimal import Decimal
+
+try:
+    import pandas as pd
+except ImportError:  # optional — fall back to row-by-row csv parsing
+    pd = None
 
 
 class Metrics:
@@ -33,27 +37,74 @@ class Metrics:
         if not os.path.exists(trades_csv):
             return
 
-        wins, losses = [], []
-        total_pnl = Decimal("0")
-
-        with open(trades_csv, "r") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                pnl = Decimal(row.get("pnl", "0"))
+        # RESOLUTION_CORRECTION rows (portfolio.confirm_resolution) reverse a
+        # provisional payout; they are netted into the token's resolution row so
+        # the corrected trade is counted once, with its final sign.
+        if pd is not None:
+            # Vectorized: parse only the columns needed, pnl straight into float64
+            df = pd.read_csv(
+                trades_csv, usecols=["action", "token_id", "pnl"],
+                dtype={"action": str, "token_id": str, "pnl": float},
+            ).dropna(subset=["pnl"])
+            total_pnl = df["pnl"].sum()
+            fix = df["action"] == "RESOLUTION_CORRECTION"
+            if fix.any():
+                adj = df[fix].groupby("token_id")["pnl"].sum()
+                df = df[~fix]
+                resolved = df[df["action"].str.startswith("RESOLUTION_", na=False)]
+                last = pd.Series(resolved.index, index=resolved["token_id"])
+                last = last[~last.index.duplicated(keep="last")]
+                common = adj.index.intersection(last.index)
+                df.loc[last[common].to_numpy(), "pnl"] += adj[common].to_numpy()
+            pnl = df["pnl"].to_numpy()
+            wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+            n_wins, n_losses = len(wins), len(losses)
+            win_sum, loss_sum = wins.sum(), losses.sum()
+        else:
+            pnls = []
+            unmatched = 0.0  # corrections whose resolution row isn't in this file
+            resolved = {}  # token_id -> index in pnls of its latest resolution row
+            with open(trades_csv, "r", newline="") as f:
+                # Plain rows indexed by precomputed columns — no dict per trade
+                reader = csv.reader(f)
+                header = next(reader, [])
+                if not {"action", "token_id", "pnl"} <= set(header):
+                    return
+                action_idx, token_idx, pnl_idx = (
+                    header.index("action"), header.index("token_id"), header.index("pnl"),
+                )
+                for row in reader:
+                    pnl = float(row[pnl_idx])
+                    action = row[action_idx]
+                    if action == "RESOLUTION_CORRECTION":
+                        i = resolved.get(row[token_idx])
+                        if i is not None:
+                            pnls[i] += pnl
+                        else:
+                            unmatched += pnl
+                        continue
+                    if action.startswith("RESOLUTION_"):
+                        resolved[row[token_idx]] = len(pnls)
+                    pnls.append(pnl)
+            n_wins = n_losses = 0
+            win_sum = loss_sum = 0.0
+            for pnl in pnls:
                 if pnl > 0:
-                    wins.append(pnl)
+                    n_wins += 1
+                    win_sum += pnl
                 elif pnl < 0:
-                    losses.append(pnl)
-                total_pnl += pnl
+                    n_losses += 1
+                    loss_sum += pnl
+            total_pnl = sum(pnls) + unmatched
 
-        total_trades = len(wins) + len(losses)
+        total_trades = n_wins + n_losses
         if total_trades == 0:
             return
 
-        win_rate = len(wins) / total_trades
-        avg_win = sum(wins) / len(wins) if wins else Decimal("0")
-        avg_loss = sum(losses) / len(losses) if losses else Decimal("0")
-        expectancy = win_rate * float(avg_win) - (1 - win_rate) * abs(float(avg_loss))
+        win_rate = n_wins / total_trades
+        avg_win = win_sum / n_wins if n_wins else 0.0
+        avg_loss = loss_sum / n_losses if n_losses else 0.0
+        expectancy = win_rate * avg_win - (1 - win_rate) * abs(avg_loss)
 
         ts = time.strftime("%Y-%m-%d")
         path = os.path.join(reports_dir, f"perf_summary_{ts}.md")
@@ -62,8 +113,8 @@ class Metrics:
             f.write(f"# Performance Summary — {ts}\n\n")
             f.write(f"| Metric | Value |\n|---|---|\n")
             f.write(f"| Total Trades | {total_trades} |\n")
-            f.write(f"| Wins | {len(wins)} |\n")
-            f.write(f"| Losses | {len(losses)} |\n")
+            f.write(f"| Wins | {n_wins} |\n")
+            f.write(f"| Losses | {n_losses} |\n")
             f.write(f"| Win Rate | {win_rate:.1%} |\n")
             f.write(f"| Avg Win | ${avg_win:.4f} |\n")
             f.write(f"| Avg Loss | ${avg_loss:.4f} |\n")
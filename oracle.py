@@ -4,10 +4,13 @@ Production upgrade:
 - AsyncOracle now opens a persistent WebSocket to Pyth Hermes instead of
   polling the REST endpoint every tick.  fetch_price() returns the in-memory
   cached value (zero latency) and falls back to Binance REST only when the WS
-  has been down for more than _STALE_SECONDS.
+  has been down for more than _STALE_SECONDS.  The price, source and
+  timestamp live in one tuple snapshot; callers must not mutate the result.
 - trading_paused is True while both feeds are unavailable, allowing main.py
   to gate strategy execution rather than trading on stale data.
 - Auto-reconnect: the WS loop retries with a 3-second back-off on any error.
+- `updated` is an asyncio.Event set on each WS price so main.py can sleep
+  until new data arrives instead of re-evaluating an unchanged tick.
 """
 import asyncio
 import json
@@ -17,46 +20,64 @@ from typing import Optional
 
 import aiohttp
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional — stdlib decode is just slower
+    from json import loads as _json_loads
+
 from config import BINANCE_API_URL, MAX_RETRIES
+from retry import retry_after, retry_sleep
 
 logger = logging.getLogger(__name__)
 
 _TIMEOUT = aiohttp.ClientTimeout(total=3)
 _PYTH_WS_URL = "wss://hermes.pyth.network/ws"
+_BINANCE_BTC_URL = BINANCE_API_URL + "BTCUSDT"
 _PYTH_BTC_FEED_ID = "e62df6c8b4a85fe1a67db44dc12de5db330f7ac66b72dc658afedf0f4a415b43"
+_PYTH_SUBSCRIBE_MSG = json.dumps({"type": "subscribe", "ids": [_PYTH_BTC_FEED_ID]})  # frozen frame
 _STALE_SECONDS = 5.0  # fall back to Binance REST if Pyth WS is this old
+_FALLBACK_RETRY_BUDGET = 2.0  # don't start a Binance retry later than this into a tick
 
 
 async def _fetch_with_retry(
-    session: aiohttp.ClientSession, url: str, max_retries: int = MAX_RETRIES
+    session: aiohttp.ClientSession,
+    url: str,
+    max_retries: int = MAX_RETRIES,
+    deadline: Optional[float] = None,
 ) -> dict | None:
-    """GET with exponential backoff. Returns parsed JSON or None."""
+    """GET with jittered exponential backoff. Returns parsed JSON or None."""
     for attempt in range(max_retries):
         try:
             async with session.get(url, timeout=_TIMEOUT) as resp:
                 if resp.status == 200:
-                    return await resp.json()
+                    return _json_loads(await resp.read())
                 if resp.status in (429, 500, 502, 503, 504):
-                    wait = 0.5 * (2 ** attempt)
-                    logger.debug(f"HTTP {resp.status} from {url[:60]}… retry in {wait:.1f}s")
-                    await asyncio.sleep(wait)
+                    logger.debug("HTTP %d from %.60s… retrying", resp.status, url)
+                    if attempt + 1 >= max_retries or not await retry_sleep(attempt, deadline, retry_after(resp)):
+                        return None
                     continue
                 return None
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            wait = 0.5 * (2 ** attempt)
-            logger.debug(f"Fetch error ({e}) — retry in {wait:.1f}s")
-            await asyncio.sleep(wait)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Fetch error (%s) — retrying", e)
+            if attempt + 1 >= max_retries or not await retry_sleep(attempt, deadline):
+                return None
     return None
 
 
 class AsyncOracle:
-    def __init__(self):
-        self._session = aiohttp.ClientSession()
-        self._price: float = 0.0
-        self._source: str = "None"
-        self._last_update: float = 0.0       # monotonic timestamp of last good price
+    def __init__(self, connector: Optional[aiohttp.BaseConnector] = None):
+        # A caller-supplied connector is shared (and closed) by the caller
+        self._session = aiohttp.ClientSession(
+            connector=connector, connector_owner=connector is None,
+        )
+        # (result dict, monotonic ts) of the last good price, replaced as a
+        # whole on update so fetch_price() reads it with a single load
+        self._snapshot: tuple[dict, float] = ({"price": 0.0, "source": "None"}, float("-inf"))
         self._ws_task: Optional[asyncio.Task] = None
         self._paused: bool = True             # True until first WS or fallback succeeds
+        self.updated = asyncio.Event()        # set on every fresh WS price; main loop clears it
+        self._expo: Optional[int] = None      # last Pyth exponent seen ...
+        self._scale: float = 1.0              # ... and its cached 10 ** expo
 
     async def start(self):
         """Launch the Pyth WebSocket feed background task. Call once after __init__."""
@@ -74,16 +95,17 @@ class AsyncOracle:
         """Persistent connection to Pyth Hermes with automatic reconnection."""
         while True:
             try:
-                async with self._session.ws_connect(_PYTH_WS_URL) as ws:
-                    await ws.send_json({
-                        "type": "subscribe",
-                        "ids": [_PYTH_BTC_FEED_ID],
-                    })
+                # Tiny, latency-sensitive frames: skip permessage-deflate so each
+                # update isn't inflated; heartbeat detects silently dead sockets.
+                async with self._session.ws_connect(
+                    _PYTH_WS_URL, compress=0, autoping=True, heartbeat=15,
+                ) as ws:
+                    await ws.send_str(_PYTH_SUBSCRIBE_MSG)
                     logger.info("Oracle: Pyth WebSocket connected.")
 
                     async for msg in ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            await self._handle_pyth_msg(json.loads(msg.data))
+                            await self._handle_pyth_msg(_json_loads(msg.data))
                         elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                             logger.warning(f"Oracle: Pyth WS closed/error: {msg.data}")
                             break
@@ -104,19 +126,23 @@ class AsyncOracle:
             return
         try:
             price_info = data["price_feed"]["price"]
-            price = float(price_info["price"]) * (10 ** price_info["expo"])
+            expo = price_info["expo"]
+            if expo != self._expo:  # constant per feed in practice (-8 for BTC)
+                self._expo = expo
+                self._scale = 10.0 ** expo
+            price = float(price_info["price"]) * self._scale
             if price > 0:
-                self._price = round(price, 2)
-                self._source = "Pyth"
-                self._last_update = time.monotonic()
+                self._snapshot = ({"price": price, "source": "Pyth"}, time.monotonic())
                 self._paused = False
+                self.updated.set()
         except (KeyError, TypeError, ValueError) as e:
-            logger.debug(f"Oracle: Pyth WS parse error: {e}")
+            logger.debug("Oracle: Pyth WS parse error: %s", e)
 
     # ── Binance REST fallback ─────────────────────────────────────────────
 
     async def get_binance_btc_price(self) -> dict:
-        data = await _fetch_with_retry(self._session, BINANCE_API_URL + "BTCUSDT")
+        deadline = asyncio.get_running_loop().time() + _FALLBACK_RETRY_BUDGET
+        data = await _fetch_with_retry(self._session, _BINANCE_BTC_URL, deadline=deadline)
         if data:
             price = float(data.get("price", 0.0))
             return {"price": price, "source": "Binance"}
@@ -126,18 +152,17 @@ class AsyncOracle:
 
     async def fetch_price(self) -> dict:
         """Return cached Pyth WS price; fall back to Binance REST when stale."""
-        age = time.monotonic() - self._last_update
-        if self._price > 0 and age < _STALE_SECONDS:
-            return {"price": self._price, "source": self._source}
+        result, ts = self._snapshot
+        age = time.monotonic() - ts
+        if age < _STALE_SECONDS:
+            return result
 
         # WS data is stale or not yet seeded — try Binance REST
         binance = await self.get_binance_btc_price()
         if binance["price"] > 0:
             if age >= _STALE_SECONDS:
                 logger.warning("Oracle: Pyth WS stale. Using Binance REST fallback.")
-            self._price = binance["price"]
-            self._source = "Binance"
-            self._last_update = time.monotonic()
+            self._snapshot = (binance, time.monotonic())
             self._paused = False
             return binance
 
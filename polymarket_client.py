@@ -10,20 +10,57 @@ Production upgrades applied:
   and cancels any orphan orders not tracked in strategy.live_orders.
 - place_limit_order() now accepts price and size as str (Decimal strings) to
   eliminate floating-point dust that causes API lot-size rejections.
+- The WS book is held as price-sorted SortedDicts updated in O(log n) per
+  delta, so reading the top of book never re-sorts a side.
+- Books are returned as slotted, frozen BookSnapshot dataclasses with
+  (price, size) float tuples, so a view is shared safely and sizes are never
+  round-tripped through str.
+- REST orderbook fallback sits behind a short TTL cache that coalesces
+  concurrent requests for the same token into a single round-trip;
+  fetch_orderbooks() sends its multi-token misses as one POST /books.
+- Market rollover diffs the token set and sends subscribe/unsubscribe deltas
+  on the open WS instead of reconnecting.
+- JSON payloads (REST + WS) are decoded, and audit files encoded, with
+  orjson when installed.
+- Audit-log writes from async order paths are queued to a background writer
+  and done on a worker thread, appending to one NDJSON file per hour.
+- local_resolution() infers the winner from the books already polled when
+  one side held a bid >= 0.99 for 3 consecutive ticks up to expiry; the
+  resolver books it provisionally and confirms with check_resolution().
 - Existing fixes retained: H1 (cancel_all non-blocking), M5 (audit log cap).
 """
 import asyncio
+import concurrent.futures
 import glob
+import heapq
 import json
 import logging
 import os
+import random
+import threading
 import time
-from datetime import datetime, timezone
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
 
 import aiohttp
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds, OrderArgs, OrderType
+from sortedcontainers import SortedDict
+from yarl import URL
+
+try:
+    import orjson
+    from orjson import loads as _json_loads
+
+    def _json_dump_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS, default=str)
+except ImportError:  # orjson is optional — stdlib decode is just slower
+    from json import loads as _json_loads
+
+    def _json_dump_line(obj) -> bytes:
+        return (json.dumps(obj, separators=(",", ":"), default=str) + "\n").encode()
 
 from config import (
     POLYMARKET_API_KEY,
@@ -31,64 +68,262 @@ from config import (
     POLYMARKET_API_PASSPHRASE,
     POLYMARKET_HOST,
     MAX_RETRIES,
-    AUDIT_LOG_MAX_FILES,
+    AUDIT_LOG_MAX_HOURS,
+    AUDIT_LOG_MAX_MB,
+    ORDERBOOK_TTL_MS,
 )
+from retry import retry_after, retry_sleep
 
 logger = logging.getLogger(__name__)
 
 _TIMEOUT = aiohttp.ClientTimeout(total=5)
 _API_LOG_DIR = "logs/api_responses"
 _OB_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+# Parsed once; per-request URLs are derived with with_query() (no re-parse)
+_BOOK_URL = URL(POLYMARKET_HOST) / "book"
+_BOOKS_URL = URL(POLYMARKET_HOST) / "books"
+_EVENTS_URL = URL("https://gamma-api.polymarket.com/events")
 _OB_STALE_SECONDS = 10.0  # fall back to REST if WS cache is this old
+_ZERO_SIZES = frozenset(("0", "0.0", "0.00", "0.000", "0.0000"))  # level removals, no float() needed
+_CLOB_WORKERS = 2  # dedicated threads for blocking ClobClient calls
+_CANCEL_CONCURRENCY = 8  # parallel orphan cancels during reconciliation
+_AUDIT_QUEUE_SIZE = 1000  # pending audit records before new ones are dropped
+_AUDIT_BATCH = 32         # max records written per executor hop
+_TTL_CACHE_PRUNE_AT = 64  # entry count at which AsyncTTLCache sweeps expired keys
+_BOOK_RETRY_BUDGET = 1.0  # seconds of retrying a REST book fetch may spend inside one tick
+_WARN_INTERVAL_SECONDS = 30.0  # per-token throttle for repeated fetch-failure warnings
+_RESOLVED_BID = 0.99          # best bid at which a token is treated as the likely winner ...
+_RESOLUTION_VOTES = 3         # ... once seen in this many consecutive distinct books ...
+_RESOLUTION_VOTE_GAP = 0.4    # ... at least this many seconds apart (one vote per tick) ...
+_RESOLUTION_WINDOW = 5.0      # ... the last of them no earlier than this long before expiry
+
+
+_audit_files: Optional[deque] = None  # hourly audit logs on disk, oldest first; loaded on first write
+_audit_sizes: dict[str, int] = {}     # path -> bytes, for the total-size cap
+_audit_bytes = 0                      # sum of _audit_sizes
+_AUDIT_MAX_BYTES = AUDIT_LOG_MAX_MB * 1024 * 1024
+_audit_fh = None                      # append handle for the current hour's log
+_audit_hour = ""
+_audit_lock = threading.Lock()        # writer task and cancel_all run on different threads
+
+
+def _audit_log_many(records: list[tuple[str, object]]):
+    """Append raw API responses to the hourly NDJSON audit log, one line each.
+    Caps the directory at AUDIT_LOG_MAX_HOURS hourly logs and AUDIT_LOG_MAX_MB
+    in total, deleting the oldest first (M5 fix).
+
+    The directory is created and scanned once; the handle stays open for the
+    hour and is flushed once per batch.
+    """
+    global _audit_files, _audit_fh, _audit_hour, _audit_bytes
+    try:
+        hour = datetime.now().strftime("%Y%m%d_%H")
+        with _audit_lock:
+            if hour != _audit_hour or _audit_fh is None:
+                if _audit_files is None:
+                    os.makedirs(_API_LOG_DIR, exist_ok=True)
+                    _audit_files = deque(sorted(glob.glob(os.path.join(_API_LOG_DIR, "*.ndjson"))))
+                    for old in _audit_files:
+                        _audit_sizes[old] = os.path.getsize(old)
+                    _audit_bytes = sum(_audit_sizes.values())
+                if _audit_fh is not None:
+                    _audit_fh.close()
+                path = os.path.join(_API_LOG_DIR, f"{hour}.ndjson")
+                if path not in _audit_files:  # restarting within the same hour appends
+                    while len(_audit_files) >= AUDIT_LOG_MAX_HOURS:
+                        _drop_oldest_audit_file()
+                    _audit_files.append(path)
+                    _audit_sizes[path] = 0
+                _audit_fh = open(path, "ab")
+                _audit_hour = hour
+            written = 0
+            for label, data in records:
+                written += _audit_fh.write(_json_dump_line({
+                    "ts": datetime.now().isoformat(timespec="microseconds"),
+                    "label": label,
+                    "data": data if isinstance(data, (dict, list)) else str(data),
+                }))
+            _audit_fh.flush()
+            current = _audit_files[-1]  # this hour's file is always the newest
+            _audit_sizes[current] = _audit_sizes.get(current, 0) + written
+            _audit_bytes += written
+            while _audit_bytes > _AUDIT_MAX_BYTES and len(_audit_files) > 1:
+                _drop_oldest_audit_file()
+    except Exception:
+        pass  # audit failures must never crash the bot
 
 
-def _ensure_audit_dir():
-    os.makedirs(_API_LOG_DIR, exist_ok=True)
+def _drop_oldest_audit_file():
+    """Delete the oldest hourly audit log. Caller holds _audit_lock."""
+    global _audit_bytes
+    old = _audit_files.popleft()
+    _audit_bytes -= _audit_sizes.pop(old, 0)
+    try:
+        os.remove(old)
+    except FileNotFoundError:
+        pass
 
 
 def _audit_log(label: str, data):
-    """Persist raw API response for audit. Caps directory at AUDIT_LOG_MAX_FILES (M5 fix)."""
-    try:
-        _ensure_audit_dir()
-        files = sorted(glob.glob(os.path.join(_API_LOG_DIR, "*.json")))
-        if len(files) >= AUDIT_LOG_MAX_FILES:
-            for f in files[: len(files) - AUDIT_LOG_MAX_FILES + 1]:
-                os.remove(f)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        path = os.path.join(_API_LOG_DIR, f"{ts}_{label}.json")
-        with open(path, "w") as f:
-            json.dump(data if isinstance(data, (dict, list)) else str(data), f, indent=2, default=str)
-    except Exception:
-        pass  # audit failures must never crash the bot
+    """Persist a single raw API response for audit (see _audit_log_many)."""
+    _audit_log_many([(label, data)])
+
+
+@dataclass(slots=True, frozen=True)
+class BookSnapshot:
+    """Top of book as returned by fetch_orderbook(). Each side holds up to 5
+    (price, size) levels, best first; the defaults are the empty book."""
+    bid: float = 0.0
+    ask: float = 1.0
+    bids: tuple[tuple[float, float], ...] = ()
+    asks: tuple[tuple[float, float], ...] = ()
+
+
+_EMPTY_BOOK = BookSnapshot()
+
+
+def _level_price(level: dict) -> float:
+    return float(level["price"])
+
+
+def _parse_rest_book(data: dict) -> BookSnapshot:
+    """REST book payload -> BookSnapshot."""
+    # Only the top 5 levels are consumed — select them in O(N log 5)
+    # instead of sorting the whole side.
+    bids = tuple(
+        (float(lvl["price"]), float(lvl["size"]))
+        for lvl in heapq.nlargest(5, data.get("bids", []), key=_level_price)
+    )
+    asks = tuple(
+        (float(lvl["price"]), float(lvl["size"]))
+        for lvl in heapq.nsmallest(5, data.get("asks", []), key=_level_price)
+    )
+    return BookSnapshot(
+        bids[0][0] if bids else 0.0, asks[0][0] if asks else 1.0, bids, asks,
+    )
+
+
+# Process-wide congestion signal shared by every REST call to the Polymarket
+# hosts: 429s raise the level, which adds a jittered pre-delay to all callers.
+# Once the 429s stop it decays one step per _CONGESTION_DECAY_SECONDS, and a
+# success past that quiet period drops a further step.
+_congestion = {"level": 0, "last_429": 0.0, "last_decay": 0.0}
+_CONGESTION_MAX_LEVEL = 6
+_CONGESTION_DECAY_SECONDS = 5.0
+_CONGESTION_MAX_DELAY = 2.0  # cap on the pre-delay, whatever the level
+
+
+def _congestion_level() -> int:
+    """Current level after applying time-based decay."""
+    level = _congestion["level"]
+    if level:
+        base = max(_congestion["last_429"], _congestion["last_decay"])
+        steps = int((time.monotonic() - base) // _CONGESTION_DECAY_SECONDS)
+        if steps:
+            level = _congestion["level"] = max(level - steps, 0)
+            _congestion["last_decay"] = base + steps * _CONGESTION_DECAY_SECONDS
+    return level
+
+
+def _note_429():
+    _congestion["level"] = min(_congestion_level() + 1, _CONGESTION_MAX_LEVEL)
+    _congestion["last_429"] = time.monotonic()
+
+
+def _note_success():
+    level = _congestion_level()
+    now = time.monotonic()
+    if level and now - _congestion["last_429"] > _CONGESTION_DECAY_SECONDS:
+        _congestion["level"] = level - 1
+        _congestion["last_decay"] = now
 
 
 async def _fetch_with_retry(
     session: aiohttp.ClientSession,
-    url: str,
+    url: str | URL,
     max_retries: int = MAX_RETRIES,
+    deadline: Optional[float] = None,
+    json_body=None,
 ) -> Optional[dict]:
-    """GET with exponential backoff. Handles 429/5xx."""
+    """GET (or POST `json_body`) with jittered exponential backoff. Handles 429/5xx,
+    and paces itself by the shared congestion level."""
     for attempt in range(max_retries):
+        level = _congestion_level()
+        if level:
+            delay = random.uniform(0, min(_CONGESTION_MAX_DELAY, 0.25 * 2 ** level))
+            # A deadline-bound call can't afford the pacing: send straight away
+            if deadline is None or asyncio.get_running_loop().time() + delay <= deadline:
+                await asyncio.sleep(delay)
         try:
-            async with session.get(url, timeout=_TIMEOUT) as resp:
+            if json_body is None:
+                request = session.get(url, timeout=_TIMEOUT)
+            else:
+                request = session.post(url, json=json_body, timeout=_TIMEOUT)
+            async with request as resp:
                 if resp.status == 200:
-                    return await resp.json()
+                    _note_success()
+                    return _json_loads(await resp.read())
+                if resp.status == 429:
+                    _note_429()
                 if resp.status in (429, 500, 502, 503, 504):
-                    wait = 0.5 * (2 ** attempt)
-                    logger.debug(f"HTTP {resp.status} — retry {attempt + 1}/{max_retries} in {wait:.1f}s")
-                    await asyncio.sleep(wait)
+                    logger.debug("HTTP %d — retry %d/%d", resp.status, attempt + 1, max_retries)
+                    if attempt + 1 >= max_retries or not await retry_sleep(attempt, deadline, retry_after(resp)):
+                        return None
                     continue
-                logger.debug(f"HTTP {resp.status} from {url[:80]}")
+                logger.debug("HTTP %d from %.80s", resp.status, url)
+                return None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Fetch error (%s) — retry %d/%d", e, attempt + 1, max_retries)
+            if attempt + 1 >= max_retries or not await retry_sleep(attempt, deadline):
                 return None
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            wait = 0.5 * (2 ** attempt)
-            logger.debug(f"Fetch error ({e}) — retry {attempt + 1}/{max_retries}")
-            await asyncio.sleep(wait)
     return None
 
 
+class AsyncTTLCache:
+    """Per-key TTL cache with in-flight coalescing: concurrent misses for the
+    same key share one fetch instead of each issuing their own request."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, object]] = {}  # key -> (expires_at, value)
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str, fetch):
+        entry = self._entries.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, fetch):
+        value = await fetch()
+        now = time.monotonic()
+        if len(self._entries) >= _TTL_CACHE_PRUNE_AT:  # drop expired keys (e.g. old markets)
+            self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+        self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def peek(self, key: str):
+        """Return the cached value if still fresh, else None (never fetches)."""
+        entry = self._entries.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return entry[1]
+        return None
+
+    def put(self, key: str, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+
 class AsyncPMClient:
-    def __init__(self):
+    def __init__(self, connector: Optional[aiohttp.BaseConnector] = None):
         try:
             creds = ApiCreds(
                 api_key=POLYMARKET_API_KEY,
@@ -104,41 +339,161 @@ class AsyncPMClient:
             logger.error(f"Failed to initialize Polymarket client: {e}")
             raise
 
-        self._session = aiohttp.ClientSession()
+        # A caller-supplied connector is shared (and closed) by the caller
+        self._session = aiohttp.ClientSession(
+            connector=connector, connector_owner=connector is None,
+        )
 
-        # WS orderbook cache: token_id -> {bids: {price_str: size_str}, asks: {...}, ts: float}
+        # WS orderbook cache: token_id -> {bids: SortedDict{-price: size}, asks: SortedDict{price: size},
+        #                                  ts: float, view: memoized _cache_to_book() result or None}
         self._ob_cache: dict[str, dict] = {}
         self._ob_ws_task: Optional[asyncio.Task] = None
+        self._ob_ws: Optional[aiohttp.ClientWebSocketResponse] = None  # live socket, if connected
+        self._subscribed: frozenset[str] = frozenset()
+        self._subscribe_msg = ""                 # full subscribe frame for (re)connects
+        self._resub_task: Optional[asyncio.Task] = None
+        self.book_updated = asyncio.Event()  # set on every WS book event; main loop clears it
+        self._last_warn_ts: dict[str, float] = {}
+        # Endgame resolution inferred from the books we already poll, so the
+        # resolver needs Gamma only once, as confirmation
+        self._market_tokens: dict[str, tuple[str, str]] = {}   # slug -> (yes, no)
+        self._market_expiry: dict[str, float] = {}             # slug -> expires_at (epoch)
+        # token_id -> (hits, last_ts epoch, last counted book)
+        self._resolution_votes: dict[str, tuple[int, float, BookSnapshot]] = {}
+        self._local_verdicts: dict[str, str] = {}              # slug -> winning token_id
+        # ClobClient calls get their own warm threads instead of queueing in
+        # the default pool behind audit writes
+        self._clob_exec = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_CLOB_WORKERS, thread_name_prefix="clob",
+        )
+        self._prewarm_future: Optional[asyncio.Future] = None
+        # Audit records are written by a background task so order paths never touch disk
+        self._audit_q: asyncio.Queue = asyncio.Queue(maxsize=_AUDIT_QUEUE_SIZE)
+        self._audit_task: Optional[asyncio.Task] = None
+        # REST fallback cache — absorbs duplicate fetches within a tick
+        self._rest_book_cache = AsyncTTLCache(ORDERBOOK_TTL_MS / 1000)
 
     async def close(self):
+        if self._resub_task and not self._resub_task.done():
+            self._resub_task.cancel()
+            try:
+                await self._resub_task
+            except asyncio.CancelledError:
+                pass
         if self._ob_ws_task and not self._ob_ws_task.done():
             self._ob_ws_task.cancel()
             try:
                 await self._ob_ws_task
             except asyncio.CancelledError:
                 pass
+        if self._audit_task and not self._audit_task.done():
+            try:  # flush what's queued, but don't hold up shutdown for long
+                await asyncio.wait_for(self._audit_q.join(), timeout=2)
+            except asyncio.TimeoutError:
+                pass
+            self._audit_task.cancel()
+        self._clob_exec.shutdown(wait=False)
         await self._session.close()
 
+    # ── audit log ────────────────────────────────────────────────────────
+
+    def _audit(self, label: str, data):
+        """Queue an API response for the audit log; never blocks the event loop."""
+        if self._audit_task is None or self._audit_task.done():
+            self._audit_task = asyncio.create_task(self._audit_writer())
+        try:
+            self._audit_q.put_nowait((label, data))
+        except asyncio.QueueFull:
+            logger.debug("Audit queue full — dropping %s", label)
+
+    async def _audit_writer(self):
+        """Drain queued audit records to disk on a worker thread, taking
+        everything already queued (up to _AUDIT_BATCH) in one executor hop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._audit_q.get()]
+            while len(batch) < _AUDIT_BATCH and not self._audit_q.empty():
+                batch.append(self._audit_q.get_nowait())
+            try:
+                await loop.run_in_executor(None, _audit_log_many, batch)
+            finally:
+                for _ in batch:
+                    self._audit_q.task_done()
+
     # ── WebSocket orderbook feed ──────────────────────────────────────────
 
     def start_orderbook_ws(self, token_ids: list[str]):
-        """Start (or restart) the orderbook WS subscription for the given tokens."""
+        """Subscribe the orderbook WS to the given tokens.
+
+        On a live connection only the delta against the current subscription
+        is sent, so the socket (and any book that carries over) stays warm
+        across market rollover; otherwise the WS task is (re)started.
+        """
+        new = frozenset(token_ids)
+        old, self._subscribed = self._subscribed, new
+        # Unsubscribed books stop updating: evict them so the cache stays the
+        # size of the subscription and any held old-market token reads via REST
+        for token_id in old - new:
+            self._ob_cache.pop(token_id, None)
+        self._subscribe_msg = json.dumps({"assets_ids": list(new), "type": "subscribe"})
+
+        ws = self._ob_ws
+        if ws is not None and not ws.closed and self._ob_ws_task and not self._ob_ws_task.done():
+            if new != old:
+                # Chained behind any delta still in flight so sends stay ordered;
+                # cancelling the newest update (close()) cancels the whole chain
+                prev = self._resub_task
+                self._resub_task = asyncio.create_task(
+                    self._update_subscription(ws, new - old, old - new, prev)
+                )
+                if prev is not None and not prev.done():
+                    self._resub_task.add_done_callback(
+                        lambda t, p=prev: p.cancel() if t.cancelled() else None
+                    )
+            return
+
         if self._ob_ws_task and not self._ob_ws_task.done():
             self._ob_ws_task.cancel()
-        self._ob_ws_task = asyncio.create_task(self._ob_ws_loop(token_ids))
-        logger.info(f"Orderbook WS task started for {len(token_ids)} token(s).")
+        self._ob_ws_task = asyncio.create_task(self._ob_ws_loop())
+        logger.info(f"Orderbook WS task started for {len(new)} token(s).")
+
+    async def _update_subscription(
+        self, ws, adds: frozenset[str], removes: frozenset[str],
+        prev: Optional[asyncio.Task] = None,
+    ):
+        """Send unsubscribe/subscribe deltas on an open socket, after `prev` (the
+        previous update) has finished; on failure close it so _ob_ws_loop
+        reconnects with the full current subscription."""
+        if prev is not None:
+            await prev  # never raises but CancelledError: failures are handled below
+        if ws.closed:
+            return  # an earlier update failed; the reconnect sends the full set
+        try:
+            if removes:
+                await ws.send_str(json.dumps({"assets_ids": list(removes), "operation": "unsubscribe"}))
+            if adds:
+                await ws.send_str(json.dumps({"assets_ids": list(adds), "operation": "subscribe"}))
+            logger.info(f"Orderbook WS: subscription updated (+{len(adds)} / -{len(removes)}).")
+        except Exception as e:
+            logger.warning(f"Orderbook WS resubscribe failed ({e}). Reconnecting…")
+            await ws.close()
 
-    async def _ob_ws_loop(self, token_ids: list[str]):
+    async def _ob_ws_loop(self):
         """Persistent WS connection to Polymarket market feed with auto-reconnect."""
         while True:
             try:
-                async with self._session.ws_connect(_OB_WS_URL) as ws:
-                    await ws.send_json({"assets_ids": token_ids, "type": "subscribe"})
+                # Book snapshots are large, repetitive JSON: offer permessage-deflate
+                # (ignored if the server doesn't accept it); heartbeat catches dead sockets.
+                async with self._session.ws_connect(
+                    _OB_WS_URL, compress=15, autoping=True, heartbeat=20,
+                ) as ws:
+                    await ws.send_str(self._subscribe_msg)
+                    self._ob_ws = ws
                     logger.info("Orderbook WS: connected and subscribed.")
 
                     async for msg in ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            self._handle_ob_message(json.loads(msg.data))
+                            self._handle_ob_message(_json_loads(msg.data))
                         elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
                             logger.warning(f"Orderbook WS closed/error: {msg.data}")
                             break
@@ -147,6 +502,8 @@ class AsyncPMClient:
                 return
             except Exception as e:
                 logger.warning(f"Orderbook WS exception ({e}). Reconnecting in 3s…")
+            finally:
+                self._ob_ws = None
 
             try:
                 await asyncio.sleep(3)
@@ -155,105 +512,220 @@ class AsyncPMClient:
 
     def _handle_ob_message(self, events):
         """Process a list of orderbook events (book snapshot or price_change deltas)."""
-        if not isinstance(events, list):
+        if not isinstance(events, list) or not events:
             return
 
+        subscribed = self._subscribed
+        updated = False
         now = time.monotonic()
         for event in events:
             token_id = event.get("asset_id", "")
-            if not token_id:
+            if token_id not in subscribed:  # also drops stragglers after an unsubscribe
                 continue
 
             event_type = event.get("event_type", "")
 
             if event_type == "book":
-                # Full snapshot — replace cache entirely
-                bids = {b["price"]: b["size"] for b in event.get("bids", [])}
-                asks = {a["price"]: a["size"] for a in event.get("asks", [])}
-                self._ob_cache[token_id] = {"bids": bids, "asks": asks, "ts": now}
+                # Full snapshot — replace cache entirely. Bids are keyed by
+                # -price so both sides iterate best-first.
+                bids = SortedDict()
+                for b in event.get("bids", []):
+                    size = float(b["size"])
+                    if size > 0:
+                        bids[-float(b["price"])] = size
+                asks = SortedDict()
+                for a in event.get("asks", []):
+                    size = float(a["size"])
+                    if size > 0:
+                        asks[float(a["price"])] = size
+                self._ob_cache[token_id] = {"bids": bids, "asks": asks, "ts": now, "view": None}
+                updated = True
 
             elif event_type == "price_change":
                 # Delta — apply individual level changes
                 if token_id not in self._ob_cache:
-                    self._ob_cache[token_id] = {"bids": {}, "asks": {}, "ts": now}
+                    self._ob_cache[token_id] = {"bids": SortedDict(), "asks": SortedDict(), "ts": now, "view": None}
                 cache = self._ob_cache[token_id]
 
                 for change in event.get("changes", []):
-                    price = change.get("price", "")
-                    size = change.get("size", "0")
-                    side = change.get("side", "")
+                    try:
+                        price = float(change["price"])
+                    except (KeyError, ValueError):
+                        continue
+                    if change.get("side", "") == "BUY":
+                        book_side, key = cache["bids"], -price
+                    else:
+                        book_side, key = cache["asks"], price
 
-                    book_side = "bids" if side == "BUY" else "asks"
-                    if float(size) == 0:
-                        cache[book_side].pop(price, None)
+                    size = change.get("size", "0")
+                    if size in _ZERO_SIZES or (size := float(size)) == 0:
+                        book_side.pop(key, None)
                     else:
-                        cache[book_side][price] = size
+                        book_side[key] = size
 
                 cache["ts"] = now
+                cache["view"] = None  # invalidate the memoized BookSnapshot
+                updated = True
 
-    def _cache_to_book(self, cache: dict) -> dict:
-        """Convert internal WS cache format to the standard fetch_orderbook dict."""
-        bids = sorted(
-            [(float(p), float(s)) for p, s in cache["bids"].items() if float(s) > 0],
-            reverse=True,
-        )
-        asks = sorted(
-            [(float(p), float(s)) for p, s in cache["asks"].items() if float(s) > 0],
+        if updated:
+            self.book_updated.set()
+
+    def _cache_to_book(self, cache: dict) -> BookSnapshot:
+        """Convert internal WS cache format to a BookSnapshot.
+
+        Both sides are already kept best-first, so this only reads the top 5.
+        """
+        bids = tuple((-p, s) for p, s in cache["bids"].items()[:5])
+        asks = tuple(cache["asks"].items()[:5])
+        return BookSnapshot(
+            bids[0][0] if bids else 0.0, asks[0][0] if asks else 1.0, bids, asks,
         )
-        return {
-            "bid": bids[0][0] if bids else 0.0,
-            "ask": asks[0][0] if asks else 1.0,
-            "bids": [{"price": str(p), "size": str(s)} for p, s in bids[:5]],
-            "asks": [{"price": str(p), "size": str(s)} for p, s in asks[:5]],
-        }
 
     # ── orderbook ────────────────────────────────────────────────────────
 
-    async def fetch_orderbook(self, token_id: str) -> dict:
-        """Return orderbook from WS cache; fall back to REST if cache is absent/stale."""
+    def _ws_book(self, token_id: str) -> Optional[BookSnapshot]:
+        """Book from the WS cache if present and fresh, else None."""
         cached = self._ob_cache.get(token_id)
         if cached and time.monotonic() - cached["ts"] < _OB_STALE_SECONDS:
-            return self._cache_to_book(cached)
-
-        # Cache miss or stale — fall back to REST
-        return await self._fetch_orderbook_rest(token_id)
-
-    async def _fetch_orderbook_rest(self, token_id: str) -> dict:
-        url = f"{POLYMARKET_HOST}/book?token_id={token_id}"
-        data = await _fetch_with_retry(self._session, url)
+            # Memoized until the next WS delta (snapshots are immutable)
+            view = cached["view"]
+            if view is None:
+                view = cached["view"] = self._cache_to_book(cached)
+            return view
+        return None
 
-        if data:
-            bids = data.get("bids", [])
-            asks = data.get("asks", [])
+    def _vote_resolution(self, token_id: str, book: BookSnapshot):
+        """Count consecutive polls where `token_id` bids at >= _RESOLVED_BID;
+        any lower bid resets the count. Re-reads of the same memoized WS view
+        or TTL-cached REST book are not new evidence and don't count."""
+        if book.bid < _RESOLVED_BID:
+            if token_id in self._resolution_votes:
+                del self._resolution_votes[token_id]
+            return
+        now = time.time()
+        hits, last_ts, last_book = self._resolution_votes.get(token_id, (0, float("-inf"), None))
+        if book is not last_book and now - last_ts >= _RESOLUTION_VOTE_GAP:
+            self._resolution_votes[token_id] = (hits + 1, now, book)
+
+    def _settle_votes(self):
+        """Turn the votes of every expired market into a local verdict (or
+        none) and drop them, so they never carry past rollover.
+
+        A token wins only with _RESOLUTION_VOTES consecutive high-bid books,
+        the last within _RESOLUTION_WINDOW of expiry, and only if the other
+        token has no such streak.
+        """
+        now = time.time()
+        for slug, expires_at in list(self._market_expiry.items()):
+            if now < expires_at:
+                continue
+            del self._market_expiry[slug]
+            qualified = []
+            for token_id in self._market_tokens.get(slug, ()):
+                hits, last_ts, _ = self._resolution_votes.pop(token_id, (0, float("-inf"), None))
+                if hits >= _RESOLUTION_VOTES and last_ts >= expires_at - _RESOLUTION_WINDOW:
+                    qualified.append(token_id)
+            if len(qualified) == 1:
+                self._local_verdicts[slug] = qualified[0]
+
+    def local_resolution(self, slug: str) -> Optional[str]:
+        """Winning token_id for an expired `slug` inferred from the orderbooks
+        polled before expiry, or None. Provisional: confirm with check_resolution()."""
+        self._settle_votes()
+        return self._local_verdicts.pop(slug, None)
+
+    async def fetch_orderbook(self, token_id: str) -> BookSnapshot:
+        """Return orderbook from WS cache; fall back to REST if cache is absent/stale."""
+        book = self._ws_book(token_id)
+        if book is None:
+            # Cache miss or stale — fall back to REST (TTL-cached, coalesced)
+            book = await self._rest_book_cache.get(
+                token_id, lambda: self._fetch_orderbook_rest(token_id)
+            )
+        self._vote_resolution(token_id, book)
+        return book
 
-            if bids:
-                bids = sorted(bids, key=lambda x: float(x["price"]), reverse=True)
-                best_bid = float(bids[0]["price"])
-            else:
-                best_bid = 0.0
+    async def fetch_orderbooks(self, token_ids: list[str]) -> dict[str, BookSnapshot]:
+        """Fetch several orderbooks concurrently over the shared session.
 
-            if asks:
-                asks = sorted(asks, key=lambda x: float(x["price"]))
-                best_ask = float(asks[0]["price"])
+        Books not served from the WS or REST caches are fetched together with
+        one POST /books; anything that misses falls back to per-token fetches,
+        run concurrently. Returns token_id -> book; a failed fetch yields an
+        empty book (bid=0.0) so callers mark pessimistically.
+        """
+        result = {}
+        misses = []
+        for token_id in dict.fromkeys(token_ids):
+            book = self._ws_book(token_id)
+            if book is None:
+                book = self._rest_book_cache.peek(token_id)
+            if book is None:
+                misses.append(token_id)
             else:
-                best_ask = 1.0
+                result[token_id] = book
 
-            return {"bid": best_bid, "ask": best_ask, "bids": bids[:5], "asks": asks[:5]}
+        if len(misses) > 1:
+            for token_id, book in (await self._fetch_orderbooks_rest(misses)).items():
+                self._rest_book_cache.put(token_id, book)
+                result[token_id] = book
+            misses = [t for t in misses if t not in result]
 
-        return {"bid": 0.0, "ask": 1.0, "bids": [], "asks": []}
+        books = await asyncio.gather(
+            *(self.fetch_orderbook(t) for t in misses), return_exceptions=True,
+        )
+        for token_id, book in zip(misses, books):
+            if isinstance(book, Exception):
+                # Throttled per token so an outage doesn't flood the log every tick
+                now = time.monotonic()
+                if now - self._last_warn_ts.get(token_id, 0.0) > _WARN_INTERVAL_SECONDS:
+                    self._last_warn_ts[token_id] = now
+                    logger.warning(f"⚠️ Orderbook fetch failed for {token_id[:8]}: {book}. Using mark=0.")
+                book = _EMPTY_BOOK
+            result[token_id] = book
+        return result
+
+    async def _fetch_orderbook_rest(self, token_id: str) -> BookSnapshot:
+        deadline = asyncio.get_running_loop().time() + _BOOK_RETRY_BUDGET
+        data = await _fetch_with_retry(
+            self._session, _BOOK_URL.with_query(token_id=token_id), deadline=deadline,
+        )
+        if data:
+            return _parse_rest_book(data)
+        return _EMPTY_BOOK
+
+    async def _fetch_orderbooks_rest(self, token_ids: list[str]) -> dict[str, BookSnapshot]:
+        """One POST /books for several tokens. Returns only the books received."""
+        deadline = asyncio.get_running_loop().time() + _BOOK_RETRY_BUDGET
+        data = await _fetch_with_retry(
+            self._session, _BOOKS_URL, deadline=deadline,
+            json_body=[{"token_id": t} for t in token_ids],
+        )
+        books = {}
+        if isinstance(data, list):
+            for row in data:
+                token_id = row.get("asset_id") if isinstance(row, dict) else None
+                if token_id:
+                    books[token_id] = _parse_rest_book(row)
+        return books
 
     # ── market discovery ─────────────────────────────────────────────────
 
     async def get_active_market(self):
-        curr_ts = int(time.time())
-        current_base = (curr_ts // 900) * 900
-
-        for ts in [current_base, current_base + 900, current_base + 1800, current_base - 900]:
-            slug = f"btc-updown-15m-{ts}"
-            url = f"https://gamma-api.polymarket.com/events?slug={slug}"
-            data = await _fetch_with_retry(self._session, url)
+        current_base = (int(time.time()) // 900) * 900
+
+        # Query every candidate slug at once (1x RTT instead of up to 4x), then
+        # take the first match in priority order.
+        slugs = [
+            f"btc-updown-15m-{ts}"
+            for ts in (current_base, current_base + 900, current_base + 1800, current_base - 900)
+        ]
+        responses = await asyncio.gather(
+            *(_fetch_with_retry(self._session, _EVENTS_URL.with_query(slug=slug)) for slug in slugs),
+            return_exceptions=True,
+        )
 
-            if not data:
+        for slug, data in zip(slugs, responses):
+            if not data or isinstance(data, Exception):
                 continue
 
             try:
@@ -263,15 +735,16 @@ class AsyncPMClient:
                 if not end_str:
                     continue
 
-                end_dt = datetime.fromisoformat(end_str.replace("Z", "+00:00"))
-                seconds_until_close = (end_dt - datetime.now(timezone.utc)).total_seconds()
+                # 3.11's fromisoformat takes the trailing "Z"; compare as epoch floats
+                expires_at = datetime.fromisoformat(end_str).timestamp()
+                seconds_until_close = expires_at - time.time()
 
                 if 0 < seconds_until_close < 1200:
                     tokens = m.get("clobTokenIds")
                     if not tokens:
                         tokens = m.get("tokens", [])
                     if isinstance(tokens, str):
-                        tokens = json.loads(tokens)
+                        tokens = _json_loads(tokens)
 
                     token_ids = [t["token_id"] if isinstance(t, dict) else t for t in tokens]
 
@@ -281,16 +754,19 @@ class AsyncPMClient:
                             f"(Closes in {int(seconds_until_close)}s)",
                             extra={"markup": True},
                         )
+                        self._settle_votes()  # rollover: freeze the expiring market's votes
+                        self._market_tokens[slug] = (token_ids[0], token_ids[1])
+                        self._market_expiry[slug] = expires_at
                         return {
                             "title": m.get("question"),
                             "condition_id": m.get("conditionId"),
                             "yes_token": token_ids[0],
                             "no_token": token_ids[1],
-                            "expires_at": end_dt.timestamp(),
+                            "expires_at": expires_at,
                             "slug": slug,
                         }
             except (IndexError, KeyError, TypeError) as e:
-                logger.debug(f"Parse error on {slug}: {e}")
+                logger.debug("Parse error on %s: %s", slug, e)
 
         logger.warning("No active 5-minute BTC market found closing soon.")
         return None
@@ -309,10 +785,29 @@ class AsyncPMClient:
         except Exception as e:
             logger.error(f"Failed to cancel all orders: {e}")
 
+    def prewarm_order_metadata(self, token_ids: list[str]):
+        """Resolve tick size, neg-risk flag and fee rate for new tokens on the
+        CLOB thread now, so the first order in a market finds them in
+        ClobClient's per-token caches instead of fetching them inline."""
+        client = self.sync_client
+        getters = [client.get_tick_size, client.get_neg_risk]
+        if hasattr(client, "get_fee_rate_bps"):  # newer py_clob_client only
+            getters.append(client.get_fee_rate_bps)
+
+        def _warm():
+            for token_id in token_ids:
+                for getter in getters:
+                    try:
+                        getter(token_id)
+                    except Exception as e:  # create_order will simply retry the lookup
+                        logger.debug("Order metadata prewarm failed for %.8s: %s", token_id, e)
+
+        self._prewarm_future = asyncio.get_running_loop().run_in_executor(self._clob_exec, _warm)
+
     async def cancel_all_orders_async(self):
         """H1 fix: Async wrapper for cancel_all — won't block event loop."""
         loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self.cancel_all_orders)
+        await loop.run_in_executor(self._clob_exec, self.cancel_all_orders)
 
     async def place_limit_order(
         self,
@@ -325,11 +820,17 @@ class AsyncPMClient:
         """Place a limit order. Accepts price and size as Decimal strings to avoid
         floating-point dust that causes Polymarket lot-size rejections."""
 
-        # Convert once here with full precision; float(Decimal(s)) is exact for
-        # properly quantized values (3 d.p. prices, 2 d.p. sizes).
+        # OrderArgs is typed float and py_clob_client's order builder does float
+        # math (round_normal/round_down to the tick and lot size), so the
+        # Decimal strings are converted once, here. For quantized values (3 d.p.
+        # prices, 2 d.p. sizes) the float's repr round-trips to the same string,
+        # so the builder's rounding sees exactly the intended value.
         price_f = float(price)
         size_f = float(size)
 
+        # Our own order changes the book — don't serve a pre-trade snapshot
+        self._rest_book_cache.invalidate(token_id)
+
         def _build_and_post():
             order_args = OrderArgs(price=price_f, size=size_f, side=side, token_id=token_id)
             signed_order = self.sync_client.create_order(order_args)
@@ -337,9 +838,9 @@ class AsyncPMClient:
 
         try:
             loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(None, _build_and_post)
+            res = await loop.run_in_executor(self._clob_exec, _build_and_post)
 
-            _audit_log(f"place_order_{side}", res)
+            self._audit(f"place_order_{side}", res)
 
             if res and res.get("success"):
                 order_id = res.get("orderID", "")
@@ -364,16 +865,39 @@ class AsyncPMClient:
 
         try:
             loop = asyncio.get_running_loop()
-            res = await loop.run_in_executor(None, _cancel)
-            _audit_log(f"cancel_{order_id[:8]}", res)
+            res = await loop.run_in_executor(self._clob_exec, _cancel)
+            self._audit(f"cancel_{order_id[:8]}", res)
             if res:
-                logger.debug(f"🗑️ Cancelled order {order_id[:8]}…")
+                logger.debug("🗑️ Cancelled order %.8s…", order_id)
                 return True
             return False
         except Exception as e:
             logger.error(f"Failed to cancel order {order_id}: {e}")
             return False
 
+    async def cancel_orders(self, order_ids: list[str]) -> Optional[int]:
+        """Cancel several orders in one signed request.
+
+        Returns how many the exchange reports cancelled, or None if the batch
+        call itself failed (callers may fall back to cancel_order).
+        """
+
+        def _cancel():
+            return self.sync_client.cancel_orders(order_ids)
+
+        try:
+            loop = asyncio.get_running_loop()
+            res = await loop.run_in_executor(self._clob_exec, _cancel)
+            self._audit(f"cancel_batch_{len(order_ids)}", res)
+            if not isinstance(res, dict):
+                return None
+            for order_id, reason in (res.get("not_canceled") or {}).items():
+                logger.warning(f"Cancel rejected for {order_id[:8]}…: {reason}")
+            return len(res.get("canceled") or [])
+        except Exception as e:
+            logger.error(f"Batch cancel of {len(order_ids)} order(s) failed: {e}")
+            return None
+
     # ── reconciliation ───────────────────────────────────────────────────
 
     async def sync_open_orders(self, strategy_live_orders: dict[str, dict[str, str]]) -> int:
@@ -389,7 +913,7 @@ class AsyncPMClient:
 
         try:
             loop = asyncio.get_running_loop()
-            orders = await loop.run_in_executor(None, _fetch)
+            orders = await loop.run_in_executor(self._clob_exec, _fetch)
         except Exception as e:
             logger.error(f"sync_open_orders: {e}")
             return 0
@@ -405,17 +929,28 @@ class AsyncPMClient:
             if oid
         }
 
-        cancelled = 0
-        for order in orders:
-            order_id = order.get("id") or order.get("orderID", "")
-            if not order_id:
-                continue
-            if order_id not in tracked_ids:
-                logger.warning(
-                    f"🔍 Orphaned order {order_id[:8]}… not in strategy state — cancelling."
-                )
-                if await self.cancel_order(order_id):
-                    cancelled += 1
+        server_ids = {order.get("id") or order.get("orderID", "") for order in orders}
+        server_ids.discard("")
+        orphans = list(server_ids - tracked_ids)
+
+        for order_id in orphans:
+            logger.warning(
+                f"🔍 Orphaned order {order_id[:8]}… not in strategy state — cancelling."
+            )
+
+        # One signed batch request; per-order cancels only if the batch fails
+        cancelled = await self.cancel_orders(orphans) if orphans else 0
+        if cancelled is None:
+            limiter = asyncio.Semaphore(_CANCEL_CONCURRENCY)
+
+            async def _cancel_orphan(order_id: str) -> bool:
+                async with limiter:
+                    return await self.cancel_order(order_id)
+
+            results = await asyncio.gather(
+                *(_cancel_orphan(order_id) for order_id in orphans), return_exceptions=True,
+            )
+            cancelled = sum(1 for r in results if r is True)
 
         if cancelled:
             logger.warning(f"Reconciliation: cancelled {cancelled} orphaned order(s).")
@@ -427,9 +962,20 @@ class AsyncPMClient:
     # ── resolution ───────────────────────────────────────────────────────
 
     async def check_resolution(self, slug: str) -> Optional[str]:
-        url = f"https://gamma-api.polymarket.com/events?slug={slug}&closed=true"
-        data = await _fetch_with_retry(self._session, url)
-
+        """Return the winning token_id for `slug` per Gamma, or None if not yet resolved."""
+        winner = await self._gamma_resolution(slug)
+        if winner:
+            self._forget_market(slug)
+        return winner
+
+    def _forget_market(self, slug: str):
+        self._market_expiry.pop(slug, None)
+        self._local_verdicts.pop(slug, None)
+        for token_id in self._market_tokens.pop(slug, ()):
+            self._resolution_votes.pop(token_id, None)
+
+    async def _gamma_resolution(self, slug: str) -> Optional[str]:
+        data = await _fetch_with_retry(self._session, _EVENTS_URL.with_query(slug=slug, closed="true"))
         if not data or len(data) == 0:
             return None
 
@@ -439,9 +985,9 @@ class AsyncPMClient:
                 prices = m.get("outcomePrices", [])
                 tokens = m.get("clobTokenIds", [])
                 if isinstance(tokens, str):
-                    tokens = json.loads(tokens)
+                    tokens = _json_loads(tokens)
                 if isinstance(prices, str):
-                    prices = json.loads(prices)
+                    prices = _json_loads(prices)
 
                 token_ids = [t["token_id"] if isinstance(t, dict) else t for t in tokens]
 
@@ -449,6 +995,6 @@ class AsyncPMClient:
                     if float(p) >= 0.99 or p == "1":
                         return token_ids[idx]
         except (IndexError, KeyError, TypeError) as e:
-            logger.debug(f"Resolution parse error for {slug}: {e}")
+            logger.debug("Resolution parse error for %s: %s", slug, e)
 
         return None
@@ -1,14 +1,19 @@
 """Portfolio management with Decimal-precision accounting and CSV trade logging."""
+import asyncio
+import atexit
 import csv
+import itertools
 import logging
 import os
 import time
 from decimal import Decimal, getcontext, ROUND_DOWN
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Optional
 
 getcontext().prec = 12
 
 logger = logging.getLogger(__name__)
+_MARKUP = {"markup": True}  # shared Rich `extra`, not rebuilt per call
 
 TRADES_CSV = "trades.csv"
 TRADES_HEADER = [
@@ -20,9 +25,32 @@ TRADES_HEADER = [
 D = Decimal
 ZERO = D("0")
 ONE = D("1")
+HUNDRED = D("100")
 TAKER_FEE_RATE = D("0.015")
 TICK = D("0.001")
 
+_CSV_BUFFER_BYTES = 1 << 16
+_CSV_FLUSH_ROWS = 64         # flush the trade log after this many buffered rows ...
+_CSV_FLUSH_SECONDS = 5.0     # ... or this long after the first unflushed row (timer)
+_CSV_SPECIALS = (",", '"', "\r", "\n")
+
+
+def _to_dec(x) -> Decimal:
+    """Decimals pass through untouched; anything else goes via str() so a
+    float keeps its short repr instead of its binary expansion."""
+    return x if type(x) is Decimal else D(str(x))
+
+
+def _csv_field(value) -> str:
+    """Render a text field the way csv.writer's QUOTE_MINIMAL would: None as
+    an empty field, anything else via str(), quoted only when needed."""
+    if value is None:
+        return ""
+    text = str(value)
+    if any(c in text for c in _CSV_SPECIALS):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
 
 def _ensure_csv():
     """Create CSV with header if it doesn't exist. M4 fix: atomic creation."""
@@ -35,6 +63,11 @@ def _ensure_csv():
 
 
 class PendingOrder:
+    __slots__ = (
+        "action", "market_title", "condition_id", "token_id", "side", "amount_usd",
+        "limit_price", "position", "reason", "is_taker", "signal_diff", "timestamp", "oid",
+    )
+
     def __init__(
         self,
         action: str,
@@ -54,16 +87,22 @@ class PendingOrder:
         self.condition_id = condition_id
         self.token_id = token_id
         self.side = side
-        self.amount_usd = D(str(amount_usd))
-        self.limit_price = D(str(limit_price))
+        self.amount_usd = _to_dec(amount_usd)
+        self.limit_price = _to_dec(limit_price)
         self.position = position
         self.reason = reason
         self.is_taker = is_taker
         self.signal_diff = signal_diff
         self.timestamp = time.time()
+        self.oid = -1  # assigned when the Portfolio queues the order
 
 
 class Position:
+    __slots__ = (
+        "market_title", "condition_id", "token_id", "side", "amount_usd",
+        "entry_price", "num_shares", "is_taker", "entry_time",
+    )
+
     def __init__(
         self,
         market_title: str,
@@ -78,8 +117,8 @@ class Position:
         self.condition_id = condition_id
         self.token_id = token_id
         self.side = side
-        self.amount_usd = D(str(amount_usd))
-        self.entry_price = D(str(entry_price))
+        self.amount_usd = _to_dec(amount_usd)
+        self.entry_price = _to_dec(entry_price)
         self.num_shares = (
             (self.amount_usd / self.entry_price).quantize(TICK, rounding=ROUND_DOWN)
             if self.entry_price > ZERO
@@ -100,10 +139,27 @@ class Portfolio:
 
     def __init__(self, initial_balance=100.0):
         _ensure_csv()
+        # One long-lived buffered handle instead of an open/write/close per trade;
+        # newline="" so the explicit \r\n row endings are written as-is
+        self._csv_fh = open(TRADES_CSV, "a", newline="", buffering=_CSV_BUFFER_BYTES)
+        self._pending_rows = 0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        atexit.register(self._csv_fh.close)
         self.balance = D(str(initial_balance))
         self.initial_capacity = D(str(initial_balance))
         self.open_positions: List[Position] = []
-        self.pending_orders: List[PendingOrder] = []
+        self._open_position_ids: set[int] = set()  # id(pos) for O(1) membership
+        self._positions_by_condition: Dict[str, List[Position]] = {}
+        self._open_cost = ZERO  # running sum of open positions' amount_usd
+        self._pnl_key: Optional[tuple] = None  # get_total_pnl_str() memo
+        self._pnl_str = ""
+        # condition_id -> (winner, positions) for resolutions awaiting confirmation
+        self._provisional: Dict[str, tuple] = {}
+        # oid -> order, plus the same orders bucketed by token so per-token
+        # fills and lookups never scan other tokens' orders
+        self.pending_orders: Dict[int, PendingOrder] = {}
+        self._pending_by_token: DefaultDict[str, Dict[int, PendingOrder]] = defaultdict(dict)
+        self._oids = itertools.count()
 
     # ── helpers ──────────────────────────────────────────────────────────
 
@@ -125,38 +181,106 @@ class Portfolio:
         fill_time: float = 0.0,
         signal_diff: float = 0.0,
     ):
-        row = [
-            time.time(),
-            market_title,
-            condition_id,
-            token_id,
-            side,
-            action,
-            str(entry_price),
-            str(exit_price),
-            str(shares),
-            str(amount_usd),
-            str(fee),
-            str(pnl),
-            exit_reason,
-            order_id,
-            str(fill_time),
-            str(signal_diff),
-        ]
+        # Hand-joined rather than csv.writer: only the free-text fields can
+        # need quoting, and the output matches csv's QUOTE_MINIMAL dialect.
+        ts = time.time()
         try:
-            with open(TRADES_CSV, "a", newline="") as f:
-                csv.writer(f).writerow(row)
+            line = (
+                f"{ts},{_csv_field(market_title)},{_csv_field(condition_id)},"
+                f"{_csv_field(token_id)},{_csv_field(side)},{action},"
+                f"{entry_price},{exit_price},{shares},{amount_usd},{fee},{pnl},"
+                f"{_csv_field(exit_reason)},{_csv_field(order_id)},{fill_time},{signal_diff}\r\n"
+            )
+            self._csv_fh.write(line)
         except Exception as e:
             logger.error(f"Failed to write trade log: {e}")
+            return
+        self._pending_rows += 1
+        if self._pending_rows >= _CSV_FLUSH_ROWS:
+            self.flush_trades()
+        elif self._flush_timer is None:
+            # First buffered row: make sure it reaches disk within
+            # _CSV_FLUSH_SECONDS even if no further trade arrives
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:  # no event loop (scripts/tools) — don't buffer
+                self.flush_trades()
+            else:
+                self._flush_timer = loop.call_later(_CSV_FLUSH_SECONDS, self.flush_trades)
+
+    def flush_trades(self):
+        """Push buffered trade rows to trades.csv (e.g. before reading it back)."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._pending_rows == 0:
+            return
+        try:
+            self._csv_fh.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush trade log: {e}")
+        self._pending_rows = 0
+
+    def _add_position(self, pos: Position):
+        self.open_positions.append(pos)
+        self._open_position_ids.add(id(pos))
+        self._positions_by_condition.setdefault(pos.condition_id, []).append(pos)
+        self._open_cost += pos.amount_usd
+
+    def has_position(self, pos: Position) -> bool:
+        return id(pos) in self._open_position_ids
+
+    def close_position(self, pos: Position) -> bool:
+        """Drop `pos` from open positions; False if it was not open."""
+        if id(pos) not in self._open_position_ids:
+            return False
+        self._open_position_ids.discard(id(pos))
+        self.open_positions.remove(pos)
+        same_market = self._positions_by_condition[pos.condition_id]
+        same_market.remove(pos)
+        if not same_market:
+            del self._positions_by_condition[pos.condition_id]
+        self._open_cost -= pos.amount_usd
+        return True
+
+    def _add_pending(self, order: PendingOrder):
+        order.oid = next(self._oids)
+        self.pending_orders[order.oid] = order
+        self._pending_by_token[order.token_id][order.oid] = order
+
+    def _remove_pending(self, order: PendingOrder) -> bool:
+        if self.pending_orders.pop(order.oid, None) is None:
+            return False
+        bucket = self._pending_by_token[order.token_id]
+        del bucket[order.oid]
+        if not bucket:
+            del self._pending_by_token[order.token_id]
+        return True
+
+    def has_pending(self, token_id: str, action: Optional[str] = None) -> bool:
+        """True if a pending order exists for `token_id` (and `action`, if given)."""
+        bucket = self._pending_by_token.get(token_id)
+        if not bucket:
+            return False
+        return action is None or any(o.action == action for o in bucket.values())
+
+    def _log_cash_line(self):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"💵 [PORTFOLIO] Available Cash: [bold]${self.balance}[/bold] "
+                f"(Total P&L: {self.get_total_pnl_str()})",
+                extra=_MARKUP,
+            )
 
     # ── MTM ──────────────────────────────────────────────────────────────
 
     def get_total_equity(self) -> Decimal:
         """Return balance + cost basis of open positions. Simplified for Static Sniper."""
-        equity = self.balance
-        for pos in self.open_positions:
-            equity += pos.amount_usd
-        return equity
+        return self.balance + self._open_cost
+
+    def get_open_exposure(self) -> Decimal:
+        """Total cost basis of open positions."""
+        return self._open_cost
 
     # ── BUY ──────────────────────────────────────────────────────────────
 
@@ -171,14 +295,14 @@ class Portfolio:
         is_taker: bool = False,
         signal_diff: float = 0.0,
     ) -> bool:
-        amount_usd = D(str(amount_usd))
-        limit_price = D(str(limit_price))
+        amount_usd = _to_dec(amount_usd)
+        limit_price = _to_dec(limit_price)
 
         if self.balance < amount_usd:
             logger.warning(
                 f"⚠️  [PORTFOLIO] Insufficient balance (${self.balance}) "
                 f"to execute ${amount_usd} buy.",
-                extra={"markup": True},
+                extra=_MARKUP,
             )
             return False
 
@@ -187,7 +311,7 @@ class Portfolio:
 
         if is_taker:
             pos = Position(market_title, condition_id, token_id, side, amount_usd, limit_price, is_taker=True)
-            self.open_positions.append(pos)
+            self._add_position(pos)
 
             self._log_trade(
                 "BUY", market_title, condition_id, token_id, side,
@@ -195,29 +319,27 @@ class Portfolio:
                 signal_diff=signal_diff,
             )
 
-            logger.info(
-                f"📥 [bold green][PORTFOLIO] Executed TAKER Buy:[/bold green] "
-                f"{pos.num_shares} shares of {side} at ${limit_price}"
-                + (f" (Fee: ${fee})" if fee > ZERO else ""),
-                extra={"markup": True},
-            )
-            logger.info(
-                f"💵 [PORTFOLIO] Available Cash: [bold]${self.balance}[/bold] "
-                f"(Total P&L: {self.get_total_pnl_str()})",
-                extra={"markup": True},
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"📥 [bold green][PORTFOLIO] Executed TAKER Buy:[/bold green] "
+                    f"{pos.num_shares} shares of {side} at ${limit_price}"
+                    + (f" (Fee: ${fee})" if fee > ZERO else ""),
+                    extra=_MARKUP,
+                )
+            self._log_cash_line()
             return True
         else:
             order = PendingOrder(
                 "BUY", market_title, condition_id, token_id, side,
                 amount_usd, limit_price, is_taker=False, signal_diff=signal_diff,
             )
-            self.pending_orders.append(order)
-            logger.info(
-                f"⏳ [bold yellow][PORTFOLIO] Pending MAKER Buy placed:[/bold yellow] "
-                f"{amount_usd / limit_price} shares of {side} at ${limit_price} (Awaiting Fill)",
-                extra={"markup": True},
-            )
+            self._add_pending(order)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"⏳ [bold yellow][PORTFOLIO] Pending MAKER Buy placed:[/bold yellow] "
+                    f"{amount_usd / limit_price} shares of {side} at ${limit_price} (Awaiting Fill)",
+                    extra=_MARKUP,
+                )
             return True
 
     # ── SELL ─────────────────────────────────────────────────────────────
@@ -230,10 +352,10 @@ class Portfolio:
         is_taker: bool = False,
         signal_diff: float = 0.0,
     ) -> bool:
-        limit_price = D(str(limit_price))
+        limit_price = _to_dec(limit_price)
 
-        if position not in self.open_positions:
-            logger.warning("⚠️  [PORTFOLIO] Attempted to sell a position not in portfolio.", extra={"markup": True})
+        if not self.has_position(position):
+            logger.warning("⚠️  [PORTFOLIO] Attempted to sell a position not in portfolio.", extra=_MARKUP)
             return False
 
         if is_taker:
@@ -242,7 +364,7 @@ class Portfolio:
             profit = (revenue - fee) - position.amount_usd
 
             self.balance += (revenue - fee)
-            self.open_positions.remove(position)
+            self.close_position(position)
 
             self._log_trade(
                 "SELL", position.market_title, position.condition_id,
@@ -252,23 +374,20 @@ class Portfolio:
                 exit_reason=reason, signal_diff=signal_diff,
             )
 
-            pnl_color = "green" if profit >= ZERO else "red"
-            logger.info(
-                f"📤 [bold cyan][PORTFOLIO] EXECUTED EARLY TAKER SELL ({reason}):[/bold cyan] "
-                f"Sold {position.num_shares} shares of {position.side} at ${limit_price}"
-                + (f" (Fee: ${fee})" if fee > ZERO else ""),
-                extra={"markup": True},
-            )
-            logger.info(
-                f"💸 [PORTFOLIO] Trade P&L: [bold {pnl_color}]${profit} "
-                f"({(profit / position.amount_usd * D('100')):+.1f}%)[/bold {pnl_color}]",
-                extra={"markup": True},
-            )
-            logger.info(
-                f"💵 [PORTFOLIO] Available Cash: [bold]${self.balance}[/bold] "
-                f"(Total P&L: {self.get_total_pnl_str()})",
-                extra={"markup": True},
-            )
+            if logger.isEnabledFor(logging.INFO):
+                pnl_color = "green" if profit >= ZERO else "red"
+                logger.info(
+                    f"📤 [bold cyan][PORTFOLIO] EXECUTED EARLY TAKER SELL ({reason}):[/bold cyan] "
+                    f"Sold {position.num_shares} shares of {position.side} at ${limit_price}"
+                    + (f" (Fee: ${fee})" if fee > ZERO else ""),
+                    extra=_MARKUP,
+                )
+                logger.info(
+                    f"💸 [PORTFOLIO] Trade P&L: [bold {pnl_color}]${profit} "
+                    f"({(profit / position.amount_usd * HUNDRED):+.1f}%)[/bold {pnl_color}]",
+                    extra=_MARKUP,
+                )
+            self._log_cash_line()
             return True
         else:
             order = PendingOrder(
@@ -277,47 +396,48 @@ class Portfolio:
                 limit_price, position=position, reason=reason,
                 is_taker=False, signal_diff=signal_diff,
             )
-            self.pending_orders.append(order)
-            logger.info(
-                f"⏳ [bold yellow][PORTFOLIO] Pending MAKER Sell placed ({reason}):[/bold yellow] "
-                f"{position.num_shares} shares of {position.side} at ${limit_price} (Awaiting Fill)",
-                extra={"markup": True},
-            )
+            self._add_pending(order)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    f"⏳ [bold yellow][PORTFOLIO] Pending MAKER Sell placed ({reason}):[/bold yellow] "
+                    f"{position.num_shares} shares of {position.side} at ${limit_price} (Awaiting Fill)",
+                    extra=_MARKUP,
+                )
             return True
 
     # ── cancel ───────────────────────────────────────────────────────────
 
     def cancel_pending(self, order: PendingOrder):
-        if order in self.pending_orders:
+        if self._remove_pending(order):
             if order.action == "BUY":
                 self.balance += order.amount_usd
-            self.pending_orders.remove(order)
 
     def cancel_all_pending(self):
         count = len(self.pending_orders)
         if count == 0:
             return
-        for order in list(self.pending_orders):
+        for order in list(self.pending_orders.values()):
             self.cancel_pending(order)
-        logger.debug(f"🗑️ [PORTFOLIO] Cancelled {count} pending simulator orders.")
+        logger.debug("🗑️ [PORTFOLIO] Cancelled %d pending simulator orders.", count)
 
     # ── sim fills ────────────────────────────────────────────────────────
 
     def process_pending_orders(self, token_id: str, current_best_bid, current_best_ask):
-        current_best_bid = D(str(current_best_bid))
-        current_best_ask = D(str(current_best_ask))
+        bucket = self._pending_by_token.get(token_id)
+        if not bucket:
+            return
 
-        for order in list(self.pending_orders):
-            if order.token_id != token_id:
-                continue
+        current_best_bid = _to_dec(current_best_bid)
+        current_best_ask = _to_dec(current_best_ask)
 
+        for order in list(bucket.values()):
             if order.action == "BUY":
                 if current_best_ask <= order.limit_price:
                     pos = Position(
                         order.market_title, order.condition_id, order.token_id,
                         order.side, order.amount_usd, order.limit_price, is_taker=False,
                     )
-                    self.open_positions.append(pos)
+                    self._add_position(pos)
 
                     self._log_trade(
                         "BUY_FILL", order.market_title, order.condition_id,
@@ -328,21 +448,21 @@ class Portfolio:
                         signal_diff=order.signal_diff,
                     )
 
-                    logger.info(
-                        f"✅ [bold green][PORTFOLIO] FILLED MAKER Buy:[/bold green] "
-                        f"{pos.num_shares} shares of {order.side} at ${order.limit_price}",
-                        extra={"markup": True},
-                    )
-                    self.pending_orders.remove(order)
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info(
+                            f"✅ [bold green][PORTFOLIO] FILLED MAKER Buy:[/bold green] "
+                            f"{pos.num_shares} shares of {order.side} at ${order.limit_price}",
+                            extra=_MARKUP,
+                        )
+                    self._remove_pending(order)
 
             elif order.action == "SELL":
                 if current_best_bid >= order.limit_price:
                     pos = order.position
-                    if pos in self.open_positions:
+                    if self.close_position(pos):
                         revenue = pos.num_shares * order.limit_price
                         profit = revenue - pos.amount_usd
                         self.balance += revenue
-                        self.open_positions.remove(pos)
 
                         self._log_trade(
                             "SELL_FILL", pos.market_title, pos.condition_id,
@@ -354,36 +474,38 @@ class Portfolio:
                             signal_diff=order.signal_diff,
                         )
 
-                        pnl_color = "green" if profit >= ZERO else "red"
-                        logger.info(
-                            f"✅ [bold cyan][PORTFOLIO] FILLED MAKER SELL ({order.reason}):[/bold cyan] "
-                            f"Sold {pos.num_shares} shares of {pos.side} at ${order.limit_price}",
-                            extra={"markup": True},
-                        )
-                        logger.info(
-                            f"💸 [PORTFOLIO] Trade P&L: [bold {pnl_color}]${profit}[/bold {pnl_color}]",
-                            extra={"markup": True},
-                        )
-                        logger.info(
-                            f"💵 [PORTFOLIO] Available Cash: [bold]${self.balance}[/bold] "
-                            f"(Total P&L: {self.get_total_pnl_str()})",
-                            extra={"markup": True},
-                        )
-                    self.pending_orders.remove(order)
+                        if logger.isEnabledFor(logging.INFO):
+                            pnl_color = "green" if profit >= ZERO else "red"
+                            logger.info(
+                                f"✅ [bold cyan][PORTFOLIO] FILLED MAKER SELL ({order.reason}):[/bold cyan] "
+                                f"Sold {pos.num_shares} shares of {pos.side} at ${order.limit_price}",
+                                extra=_MARKUP,
+                            )
+                            logger.info(
+                                f"💸 [PORTFOLIO] Trade P&L: [bold {pnl_color}]${profit}[/bold {pnl_color}]",
+                                extra=_MARKUP,
+                            )
+                        self._log_cash_line()
+                    self._remove_pending(order)
 
     # ── resolution ───────────────────────────────────────────────────────
 
-    def resolve_market(self, condition_id: str, winning_token_id: str):
-        positions_to_resolve = [p for p in self.open_positions if p.condition_id == condition_id]
+    def resolve_market(self, condition_id: str, winning_token_id: str, provisional: bool = False):
+        """Settle every open position of the market. A `provisional` winner is
+        remembered so confirm_resolution() can correct it later."""
+        positions_to_resolve = self.get_positions_for_market(condition_id)
 
         if not positions_to_resolve:
             return
+        if provisional:
+            self._provisional[condition_id] = (winning_token_id, positions_to_resolve)
 
-        logger.info(
-            f"🔄 [PORTFOLIO] Resolving {len(positions_to_resolve)} positions for "
-            f"market condition {condition_id[:8]}...",
-            extra={"markup": True},
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                f"🔄 [PORTFOLIO] Resolving {len(positions_to_resolve)} positions for "
+                f"market condition {condition_id[:8]}...",
+                extra=_MARKUP,
+            )
 
         for pos in positions_to_resolve:
             if pos.token_id == winning_token_id:
@@ -397,11 +519,12 @@ class Portfolio:
                     pos.amount_usd, ZERO, profit,
                     exit_reason="Market Resolution (WIN)",
                 )
-                logger.info(
-                    f"🏆 [bold green][PORTFOLIO] WON MARKET ({pos.side}):[/bold green] "
-                    f"Payout ${revenue} (Profit: [bold]+${profit}[/bold])",
-                    extra={"markup": True},
-                )
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        f"🏆 [bold green][PORTFOLIO] WON MARKET ({pos.side}):[/bold green] "
+                        f"Payout ${revenue} (Profit: [bold]+${profit}[/bold])",
+                        extra=_MARKUP,
+                    )
             else:
                 self._log_trade(
                     "RESOLUTION_LOSS", pos.market_title, pos.condition_id,
@@ -410,27 +533,64 @@ class Portfolio:
                     pos.amount_usd, ZERO, -pos.amount_usd,
                     exit_reason="Market Resolution (LOSS)",
                 )
-                logger.info(
-                    f"💥 [bold red][PORTFOLIO] LOST MARKET ({pos.side}):[/bold red] "
-                    f"Shares expired worthless. (Loss: [bold]-${pos.amount_usd}[/bold])",
-                    extra={"markup": True},
-                )
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        f"💥 [bold red][PORTFOLIO] LOST MARKET ({pos.side}):[/bold red] "
+                        f"Shares expired worthless. (Loss: [bold]-${pos.amount_usd}[/bold])",
+                        extra=_MARKUP,
+                    )
 
-            self.open_positions.remove(pos)
+            self.close_position(pos)
 
-        logger.info(
-            f"💵 [PORTFOLIO] Available Cash: [bold]${self.balance}[/bold] "
-            f"(Total P&L: {self.get_total_pnl_str()})",
-            extra={"markup": True},
+        self.flush_trades()
+        self._log_cash_line()
+
+    def confirm_resolution(self, condition_id: str, winning_token_id: str):
+        """Confirm a provisional resolve_market(); if the real winner differs,
+        move the $1/share payout from the booked side to the real winner."""
+        booked = self._provisional.pop(condition_id, None)
+        if booked is None or booked[0] == winning_token_id:
+            return
+        booked_winner, positions = booked
+        logger.error(
+            f"🚨 [bold red][PORTFOLIO] Resolution corrected[/bold red] for market condition "
+            f"{condition_id[:8]}...: booked {booked_winner[:8]}…, actual {winning_token_id[:8]}…",
+            extra=_MARKUP,
         )
+        for pos in positions:
+            if pos.token_id == booked_winner:
+                self.balance -= pos.num_shares
+                self._log_trade(
+                    "RESOLUTION_CORRECTION", pos.market_title, pos.condition_id,
+                    pos.token_id, pos.side,
+                    pos.entry_price, ZERO, pos.num_shares,
+                    pos.amount_usd, ZERO, -pos.num_shares,
+                    exit_reason="Resolution Corrected (WIN -> LOSS)",
+                )
+            elif pos.token_id == winning_token_id:
+                self.balance += pos.num_shares
+                self._log_trade(
+                    "RESOLUTION_CORRECTION", pos.market_title, pos.condition_id,
+                    pos.token_id, pos.side,
+                    pos.entry_price, ONE, pos.num_shares,
+                    pos.amount_usd, ZERO, pos.num_shares,
+                    exit_reason="Resolution Corrected (LOSS -> WIN)",
+                )
+        self.flush_trades()
+        self._log_cash_line()
 
     # ── queries ──────────────────────────────────────────────────────────
 
     def get_positions_for_market(self, condition_id: str) -> List[Position]:
-        return [p for p in self.open_positions if p.condition_id == condition_id]
+        return list(self._positions_by_condition.get(condition_id, ()))
 
     def get_total_pnl_str(self) -> str:
-        """M1 fix: includes unrealized PnL from open positions."""
-        equity = self.get_total_equity()
-        pnl = equity - self.initial_capacity
-        return f"${pnl:+.2f}"
+        """M1 fix: includes unrealized PnL from open positions.
+
+        Memoized on (balance, open cost), the only state equity depends on.
+        """
+        key = (self.balance, self._open_cost)
+        if key != self._pnl_key:
+            pnl = self.get_total_equity() - self.initial_capacity
+            self._pnl_key, self._pnl_str = key, f"${pnl:+.2f}"
+        return self._pnl_str
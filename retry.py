@@ -0,0 +1,50 @@
+"""Retry pacing shared by the REST clients (oracle.py, polymarket_client.py).
+
+- retry_after() honours a 429's Retry-After header, given as delta-seconds or
+  an HTTP-date, capped at MAX_RETRY_AFTER.
+- retry_sleep() otherwise waits a full-jitter backoff, uniform(0, min(cap,
+  base * 2**attempt)), and refuses to retry past a caller-supplied deadline.
+"""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import aiohttp
+
+BACKOFF_BASE = 0.5  # seconds; upper bound of the first retry delay, doubled per attempt
+MAX_BACKOFF = 30.0  # cap on that upper bound
+MAX_RETRY_AFTER = 30.0  # cap on a server-supplied Retry-After
+
+
+def retry_after(resp: aiohttp.ClientResponse) -> Optional[float]:
+    """Seconds from a 429's Retry-After header (delta-seconds or HTTP-date), if any."""
+    if resp.status != 429:
+        return None
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        wait = float(value)
+    except ValueError:
+        try:
+            wait = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None  # unparseable — use the jittered backoff
+    return min(max(wait, 0.0), MAX_RETRY_AFTER)
+
+
+async def retry_sleep(attempt: int, deadline: Optional[float], server_wait: Optional[float] = None) -> bool:
+    """Sleep before retrying: `server_wait` (a parsed Retry-After) if given, else
+    a full-jitter backoff. Returns False, without sleeping, if the retry would land
+    past `deadline` (an absolute loop.time()). Callers skip this after their
+    final attempt."""
+    if server_wait is not None:
+        wait = server_wait
+    else:
+        wait = random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))
+    if deadline is not None and asyncio.get_running_loop().time() + wait > deadline:
+        return False
+    await asyncio.sleep(wait)
+    return True
@@ -15,8 +15,10 @@ Production upgrades:
 import asyncio
 import logging
 import time
+from functools import lru_cache
 import config
 from market import PriceBuffer
+from polymarket_client import BookSnapshot
 from typing import Optional
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
 
@@ -31,6 +33,28 @@ D = Decimal
 ZERO = D("0")
 TICK = D("0.001")
 SIZE_TICK = D("0.01")
+HALF = D("0.5")
+ONE = D("1")
+CENT = D("0.01")
+# Hoisted thresholds — compared on every tick, so parsed once here
+MAKER_PRICE_MAX = D("0.93")
+MAKER_PRICE_MIN = D("0.04")
+ENTRY_PRICE_MAX = D("0.60")
+ENTRY_PRICE_MIN = D("0.40")
+STOP_DROP = D("0.10")
+TP_PRICE_CAP = D("0.99")
+TP_MULTIPLIER = D("1.10")
+# price_history holds one sample per PRICE_SAMPLE_SECONDS of monotonic time,
+# however irregular the ticks, so the EMA periods span a fixed duration
+PRICE_SAMPLE_SECONDS = 0.5
+MAX_FILL_SAMPLES = 4  # slots skipped by one slow tick that are back-filled
+
+
+@lru_cache(maxsize=4096)
+def _dec(x: float) -> Decimal:
+    """float -> Decimal via str(), memoized. Book prices sit on a 0.001 grid,
+    so each distinct price is converted once instead of on every tick."""
+    return D(str(x))
 
 
 class BTCStrategy:
@@ -42,11 +66,15 @@ class BTCStrategy:
         # token_id -> {side: order_id} to track multiple orders per token
         self.live_orders: dict[str, dict[str, str]] = {}
         self._ema_cache: dict[int, float] = {}  # period -> last EMA value
+        self._next_sample = 0.0  # monotonic time the next history slot opens
+        self._last_diff = 0.0
         self.stop_cooldowns: dict[str, float] = {}
         # Orderbook cache for Signal Blending
         self.price_buffers: dict[str, PriceBuffer] = {}
         # Per-token execution locks — prevent duplicate orders during network lag
         self._locks: dict[str, asyncio.Lock] = {}
+        # Reused every tick (cleared in place) to avoid per-tick dict churn
+        self._held_books: dict[str, BookSnapshot] = {}
 
     def _get_lock(self, token_id: str) -> asyncio.Lock:
         if token_id not in self._locks:
@@ -72,19 +100,43 @@ class BTCStrategy:
 
     # ── Trend Detection (Static Thresholds) ──────────────────────────────
 
-    def get_trend(self, current_price: float) -> tuple[str, float]:
-        self.price_history.append(current_price)
+    def _add_sample(self, price: float) -> Optional[float]:
+        """Append one history sample; the EMA diff in bps once warmed up."""
+        self.price_history.append(price)
         if len(self.price_history) > LONG_EMA_PERIOD:
             self.price_history.pop(0)
 
         if len(self.price_history) < LONG_EMA_PERIOD:
-            return "NEUTRAL", 0.0
+            return None
 
         short_ema = self._calculate_ema(self.price_history[-SHORT_EMA_PERIOD:], SHORT_EMA_PERIOD)
         long_ema = self._calculate_ema(self.price_history, LONG_EMA_PERIOD)
 
         # Normalize difference to basis points (1 bps = 0.01%)
-        diff = ((short_ema - long_ema) / long_ema) * 10000
+        return ((short_ema - long_ema) / long_ema) * 10000
+
+    def get_trend(self, current_price: float, now: float) -> tuple[str, float]:
+        """Trend from the EMA crossover, sampled on a fixed PRICE_SAMPLE_SECONDS
+        grid of monotonic `now`. Ticks between slots return the last result;
+        slots a slow tick skipped are back-filled with the last sampled price
+        (the feed had nothing newer), up to MAX_FILL_SAMPLES."""
+        if now < self._next_sample:
+            return self.last_trend, self._last_diff
+        if self.price_history:
+            missed = min(int((now - self._next_sample) // PRICE_SAMPLE_SECONDS), MAX_FILL_SAMPLES)
+            held = self.price_history[-1]
+            for _ in range(missed):
+                self._add_sample(held)
+        # Next slot on the same grid; a long outage re-anchors it at `now`
+        behind = now - self._next_sample
+        self._next_sample = now + PRICE_SAMPLE_SECONDS - (
+            behind % PRICE_SAMPLE_SECONDS if behind < PRICE_SAMPLE_SECONDS * (MAX_FILL_SAMPLES + 1) else 0.0
+        )
+
+        diff = self._add_sample(current_price)
+        if diff is None:
+            self.last_trend, self._last_diff = "NEUTRAL", 0.0
+            return "NEUTRAL", 0.0
 
         if diff > 1.2:
             current_trend = "UP"
@@ -99,21 +151,21 @@ class BTCStrategy:
                 extra={"markup": True},
             )
 
-        self.last_trend = current_trend
+        self.last_trend, self._last_diff = current_trend, diff
         return current_trend, diff
 
     # ── Price Calculation ────────────────────────────────────────────────
 
     def calculate_safe_maker_price(self, best_bid: float, best_ask: float, tick_size=0.01) -> Optional[Decimal]:
-        spread = D(str(best_ask)) - D(str(best_bid))
-        tick_d = D(str(tick_size))
+        bid_d = _dec(best_bid)
+        spread = _dec(best_ask) - bid_d
 
-        if spread <= tick_d:
-            limit_price = D(str(best_bid)).quantize(TICK, rounding=ROUND_DOWN)
+        if spread <= _dec(tick_size):
+            limit_price = bid_d.quantize(TICK, rounding=ROUND_DOWN)
         else:
-            limit_price = (D(str(best_bid)) + TICK).quantize(TICK, rounding=ROUND_DOWN)
+            limit_price = (bid_d + TICK).quantize(TICK, rounding=ROUND_DOWN)
 
-        if limit_price > D("0.93") or limit_price < D("0.04"):
+        if limit_price > MAKER_PRICE_MAX or limit_price < MAKER_PRICE_MIN:
             logger.info(f"⛔ GATE 2: Price zone blocked (bid={best_bid:.3f}, ask={best_ask:.3f}) — token OTM or deeply ITM")
             return None
 
@@ -147,35 +199,30 @@ class BTCStrategy:
         pm_client,
         active_market: dict,
         oracle_res: dict,
-        orderbook_res: dict,
+        orderbook_res: BookSnapshot,
         diff: float,
         target_token: str,
         target_side: str,
     ):
         is_dry = config.DRY_RUN
 
-        best_bid = orderbook_res.get("bid", 0.0)
-        best_ask = orderbook_res.get("ask", 1.0)
+        best_bid = orderbook_res.bid
+        best_ask = orderbook_res.ask
 
         if best_bid == 0.0 and best_ask == 1.0:
             return
 
         # Adverse Selection Simulator (Dry Run Only)
-        if is_dry:
-            pending_tokens = {o.token_id for o in self.portfolio.pending_orders}
-            for tok in pending_tokens:
-                if tok == target_token:
-                    self.portfolio.process_pending_orders(tok, best_bid, best_ask)
+        if is_dry and self.portfolio.has_pending(target_token):
+            self.portfolio.process_pending_orders(target_token, _dec(best_bid), _dec(best_ask))
 
         limit_price = self.calculate_safe_maker_price(best_bid, best_ask)
         if not limit_price:
             return
 
         existing_positions = self.portfolio.get_positions_for_market(active_market["condition_id"])
-        pending_orders = self.portfolio.pending_orders
-
         # ── Order Manager (No Chasing State Machine) ─────────────────────
-        for order in list(pending_orders):
+        for order in list(self.portfolio.pending_orders.values()):
             if order.token_id != target_token and order.action == "BUY":
                 logger.info(f"🔄 Canceling {order.action} {order.side} maker order: Trend switched.")
                 if is_dry:
@@ -193,34 +240,44 @@ class BTCStrategy:
                     await self._cancel_token_orders(pm_client, order.token_id, "BUY")
 
         # ── 1. Position Management ───────────────────────────────────────
+        # Fetch every held book in one concurrent round-trip; the target
+        # token's book was already fetched by the caller, so reuse it.
+        held_books = self._held_books
+        held_books.clear()
+        if existing_positions:
+            held_tokens = [p.token_id for p in existing_positions if p.token_id != target_token]
+            if held_tokens:
+                held_books.update(await pm_client.fetch_orderbooks(held_tokens))
+            held_books[target_token] = orderbook_res
+
         for pos in existing_positions:
             pos_lock = self._get_lock(pos.token_id)
             if pos_lock.locked():
-                logger.debug(f"⏭️  pos {pos.token_id[:8]}… locked — skipping tick")
+                logger.debug("⏭️  pos %.8s… locked — skipping tick", pos.token_id)
                 continue
 
-            held_book = await pm_client.fetch_orderbook(pos.token_id)
-            held_bid = held_book.get("bid", 0.0)
-            held_ask = held_book.get("ask", 1.0)
-            held_bid_d = D(str(held_bid))
+            held_book = held_books[pos.token_id]
+            held_bid = held_book.bid
+            held_ask = held_book.ask
+            held_bid_d = _dec(held_bid)
 
             # Minimum hold time: don't fire any stop for 3s after fill,
             # to avoid immediate spread jitter after execution.
             hold_secs = time.time() - pos.entry_time if hasattr(pos, 'entry_time') else 999
-            held_mid_d = (held_bid_d + D(str(held_ask))) / D("2")
+            held_mid_d = (held_bid_d + _dec(held_ask)) * HALF
 
             # 1a. Hard $0.10 Price Crash Stop Loss (Phase 3 Delta Hedge)
             price_drop = pos.entry_price - held_mid_d
-            if hold_secs > 5 and price_drop >= D("0.10"):
+            if hold_secs > 5 and price_drop >= STOP_DROP:
                 opposite_token = active_market['yes_token'] if pos.token_id == active_market['no_token'] else active_market['no_token']
                 opp_book = await pm_client.fetch_orderbook(opposite_token)
                 
                 # FIX: Target the Ask, not the Bid, to ensure we cross the spread on a reversal.
-                opp_ask = opp_book.get("ask", 1.0)
+                opp_ask = opp_book.ask
                 
                 # Add 1 cent to the Ask to guarantee a Taker sweep even if the book shifts by milliseconds
-                hedge_limit = (D(str(opp_ask)) + TICK).quantize(TICK, rounding=ROUND_DOWN)
-                effective_exit_price = (D("1.0") - hedge_limit).quantize(TICK, rounding=ROUND_DOWN)
+                hedge_limit = (_dec(opp_ask) + TICK).quantize(TICK, rounding=ROUND_DOWN)
+                effective_exit_price = (ONE - hedge_limit).quantize(TICK, rounding=ROUND_DOWN)
 
                 logger.info(
                     f"💀 [bold red]HARD STOP LOSS[/bold red] Price dropped 10+ cents. Executing Delta Hedge! Taker Buying Opposite ID at ${hedge_limit} (Effective Exit: ${effective_exit_price}).",
@@ -239,8 +296,7 @@ class BTCStrategy:
                             post_only=False, # FIX: Must be False to act as a Taker
                         )
                         # FIX: Remove the original position from local state so we don't infinite loop
-                        if pos in self.portfolio.open_positions:
-                            self.portfolio.open_positions.remove(pos)
+                        self.portfolio.close_position(pos)
                             
                 self.last_sell_prices[pos.token_id] = hedge_limit
                 self.stop_cooldowns[pos.condition_id] = time.time()
@@ -255,11 +311,11 @@ class BTCStrategy:
                     opp_book = await pm_client.fetch_orderbook(opposite_token)
                     
                     # FIX: Target the Ask, not the Bid, to ensure we cross the spread on a reversal.
-                    opp_ask = opp_book.get("ask", 1.0)
+                    opp_ask = opp_book.ask
                     
                     # Add 1 cent to the Ask to guarantee a Taker sweep even if the book shifts by milliseconds
-                    hedge_limit = (D(str(opp_ask)) + TICK).quantize(TICK, rounding=ROUND_DOWN)
-                    effective_exit_price = (D("1.0") - hedge_limit).quantize(TICK, rounding=ROUND_DOWN)
+                    hedge_limit = (_dec(opp_ask) + TICK).quantize(TICK, rounding=ROUND_DOWN)
+                    effective_exit_price = (ONE - hedge_limit).quantize(TICK, rounding=ROUND_DOWN)
 
                     logger.info(
                         f"💀 [bold red]MOMENTUM REVERSAL[/bold red] Trend significantly shifted (diff={diff:.2f} bps). Delta Hedging Taker Buy on Opposite Token at ${hedge_limit}.",
@@ -278,8 +334,7 @@ class BTCStrategy:
                                 post_only=False, # FIX: Must be False to act as a Taker
                             )
                             # FIX: Remove the original position from local state so we don't infinite loop
-                            if pos in self.portfolio.open_positions:
-                                self.portfolio.open_positions.remove(pos)
+                            self.portfolio.close_position(pos)
                                 
                     self.last_sell_prices[pos.token_id] = hedge_limit
                     self.stop_cooldowns[pos.condition_id] = time.time()
@@ -288,7 +343,7 @@ class BTCStrategy:
                 # 1b-2. Stale Trade Scratch Exit — Trade has stagnated and momentum died
                 elif hold_secs >= 45 and abs(diff) < 1.0:
                     # Clear it out at the bid to escape the dead money
-                    sell_limit = max(D("0.01"), held_bid_d - D("0.01")).quantize(TICK, rounding=ROUND_DOWN)
+                    sell_limit = max(CENT, held_bid_d - CENT).quantize(TICK, rounding=ROUND_DOWN)
                     logger.info(
                         f"⏳ [bold yellow]STALE TRADE SCRATCH[/bold yellow] Held >45s & weak momentum (diff={diff:.2f} bps). Extricating at ${sell_limit}.",
                         extra={"markup": True},
@@ -305,18 +360,14 @@ class BTCStrategy:
                                 str(pos.num_shares.quantize(SIZE_TICK, rounding=ROUND_DOWN)),
                                 post_only=False,
                             )
-                            if pos in self.portfolio.open_positions:
-                                self.portfolio.open_positions.remove(pos)
+                            self.portfolio.close_position(pos)
                     self.last_sell_prices[pos.token_id] = sell_limit
                     self.stop_cooldowns[pos.condition_id] = time.time()
                     continue
 
             # 1c. Queue Take Profit at 10% fixed ratio
-            sell_limit = min(D("0.99"), (pos.entry_price * D("1.10")).quantize(TICK, rounding=ROUND_UP))
-            already_has_tp = any(
-                o.action == "SELL" and o.token_id == pos.token_id
-                for o in pending_orders
-            )
+            sell_limit = min(TP_PRICE_CAP, (pos.entry_price * TP_MULTIPLIER).quantize(TICK, rounding=ROUND_UP))
+            already_has_tp = self.portfolio.has_pending(pos.token_id, "SELL")
             
             if not already_has_tp:
                 logger.info(
@@ -327,7 +378,7 @@ class BTCStrategy:
                     self.portfolio.execute_sell(pos, sell_limit, reason="Take Profit", is_taker=False)
                 else:
                     if pos_lock.locked():
-                        logger.debug(f"⏭️  TP skipped: {pos.token_id[:8]}… lock held")
+                        logger.debug("⏭️  TP skipped: %.8s… lock held", pos.token_id)
                         continue
                     async with pos_lock:
                         await self._cancel_token_orders(pm_client, pos.token_id, "SELL")
@@ -344,7 +395,7 @@ class BTCStrategy:
 
         # ── 2. Entry ─────────────────────────────────────────────────────
         has_pos = any(p.token_id == target_token for p in existing_positions)
-        has_pending = any(o.token_id == target_token for o in pending_orders)
+        has_pending = self.portfolio.has_pending(target_token)
 
         if target_token not in self.price_buffers:
             self.price_buffers[target_token] = PriceBuffer(maxlen=10)
@@ -358,7 +409,7 @@ class BTCStrategy:
                 return
 
             # PHASE 4: Golden Zone ($0.40 - $0.60) exclusively
-            if limit_price > D("0.60") or limit_price < D("0.40"):
+            if limit_price > ENTRY_PRICE_MAX or limit_price < ENTRY_PRICE_MIN:
                 logger.info(f"⛔ GATE 4: Outside Golden Zone ($0.40-$0.60) — Price ${limit_price} rejected.")
                 return
 
@@ -388,10 +439,8 @@ class BTCStrategy:
                 logger.info(f"⛔ GATE 7: Spread too wide — {spread:.3f}")
                 return
 
-            bids = orderbook_res.get("bids", [])
-            asks = orderbook_res.get("asks", [])
-            total_bid_vol = sum(float(b.get("size", 0)) for b in bids)
-            total_ask_vol = sum(float(a.get("size", 0)) for a in asks)
+            total_bid_vol = sum(size for _, size in orderbook_res.bids)
+            total_ask_vol = sum(size for _, size in orderbook_res.asks)
             total_vol = total_bid_vol + total_ask_vol
 
             ofi = total_bid_vol / total_vol if total_vol > 0 else 0.5
@@ -404,7 +453,7 @@ class BTCStrategy:
             # moves, consistently entering at the worst price and losing 20-30%.
             trade_size_usd = TRADE_SIZE_USD
 
-            current_exposure = sum(p.amount_usd for p in self.portfolio.open_positions)
+            current_exposure = self.portfolio.get_open_exposure()
             if current_exposure + trade_size_usd > MAX_POSITION_USD:
                 return
 
@@ -416,7 +465,7 @@ class BTCStrategy:
             else:
                 entry_lock = self._get_lock(target_token)
                 if entry_lock.locked():
-                    logger.debug(f"⏭️  Entry skipped: {target_token[:8]}… lock held")
+                    logger.debug("⏭️  Entry skipped: %.8s… lock held", target_token)
                     return
                 async with entry_lock:
                     logger.info(
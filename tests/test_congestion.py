@@ -0,0 +1,54 @@
+import pytest
+
+import polymarket_client as pc
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pc.time, "monotonic", clock)
+    monkeypatch.setattr(pc, "_congestion", {"level": 0, "last_429": 0.0, "last_decay": 0.0})
+    return clock
+
+
+def test_429s_raise_level_up_to_cap(clock):
+    for _ in range(pc._CONGESTION_MAX_LEVEL + 3):
+        pc._note_429()
+    assert pc._congestion_level() == pc._CONGESTION_MAX_LEVEL
+
+
+def test_success_during_429_burst_does_not_decay(clock):
+    pc._note_429()
+    pc._note_429()
+    clock.now += 1.0
+    pc._note_success()
+    assert pc._congestion_level() == 2
+
+
+def test_recovery_lowers_level_monotonically(clock):
+    for _ in range(pc._CONGESTION_MAX_LEVEL):
+        pc._note_429()
+    levels = []
+    for _ in range(20):
+        clock.now += 2.0
+        pc._note_success()
+        levels.append(pc._congestion_level())
+    assert all(b <= a for a, b in zip(levels, levels[1:]))
+    assert levels[-1] == 0
+
+
+def test_level_decays_without_any_success(clock):
+    for _ in range(4):
+        pc._note_429()
+    clock.now += 2 * pc._CONGESTION_DECAY_SECONDS + 0.1
+    assert pc._congestion_level() == 2
+    clock.now += 10 * pc._CONGESTION_DECAY_SECONDS
+    assert pc._congestion_level() == 0
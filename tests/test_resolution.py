@@ -0,0 +1,124 @@
+from decimal import Decimal as D
+
+import pytest
+
+import metrics
+import polymarket_client as pc
+import portfolio
+from polymarket_client import BookSnapshot
+
+EXPIRY = 10_000.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = EXPIRY - 60.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pc.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def client():
+    client = pc.AsyncPMClient.__new__(pc.AsyncPMClient)
+    client._market_tokens = {"m": ("yes", "no")}
+    client._market_expiry = {"m": EXPIRY}
+    client._resolution_votes = {}
+    client._local_verdicts = {}
+    return client
+
+
+def _vote(client, clock, token_id, start, n=pc._RESOLUTION_VOTES):
+    clock.now = start
+    for _ in range(n):
+        client._vote_resolution(token_id, BookSnapshot(bid=0.995, ask=1.0, bids=(), asks=()))
+        clock.now += pc._RESOLUTION_VOTE_GAP + 0.1
+
+
+def test_streak_near_expiry_wins(client, clock):
+    _vote(client, clock, "yes", EXPIRY - 2.0)
+    clock.now = EXPIRY + 1.0
+    assert client.local_resolution("m") == "yes"
+    assert client._resolution_votes == {}
+
+
+def test_tie_gives_no_verdict(client, clock):
+    _vote(client, clock, "yes", EXPIRY - 2.0)
+    _vote(client, clock, "no", EXPIRY - 2.0)
+    clock.now = EXPIRY + 1.0
+    assert client.local_resolution("m") is None
+
+
+def test_stale_streak_gives_no_verdict(client, clock):
+    _vote(client, clock, "yes", EXPIRY - pc._RESOLUTION_WINDOW - 10.0)
+    clock.now = EXPIRY + 1.0
+    assert client.local_resolution("m") is None
+
+
+def test_repeated_book_counts_once(client, clock):
+    clock.now = EXPIRY - 2.0
+    book = BookSnapshot(bid=0.995, ask=1.0, bids=(), asks=())
+    for _ in range(pc._RESOLUTION_VOTES):
+        client._vote_resolution("yes", book)
+        clock.now += pc._RESOLUTION_VOTE_GAP + 0.1
+    clock.now = EXPIRY + 1.0
+    assert client.local_resolution("m") is None
+
+
+def test_no_verdict_before_expiry(client, clock):
+    _vote(client, clock, "yes", EXPIRY - 2.0)
+    assert client.local_resolution("m") is None
+    assert "m" in client._market_expiry
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    book = portfolio.Portfolio(initial_balance=100.0)
+    # $4 at 0.40 -> 10 shares on each side of one market
+    book._add_position(portfolio.Position("BTC", "cond", "yes", "YES", D("4"), D("0.40")))
+    book._add_position(portfolio.Position("BTC", "cond", "no", "NO", D("4"), D("0.40")))
+    book.balance -= D("8")
+    yield book
+    book._csv_fh.close()
+
+
+def test_confirm_resolution_moves_payout(book):
+    book.resolve_market("cond", "yes", provisional=True)
+    assert book.balance == D("102")
+    book.confirm_resolution("cond", "no")
+    assert book.balance == D("102")  # 10 shares paid out either way, now to "no"
+    assert "cond" not in book._provisional
+
+    rows = [line.split(",") for line in open(portfolio.TRADES_CSV).read().splitlines()[1:]]
+    fixes = {r[3]: D(r[11]) for r in rows if r[5] == "RESOLUTION_CORRECTION"}
+    assert fixes == {"yes": D("-10"), "no": D("10")}
+
+
+def test_confirm_resolution_same_winner_is_noop(book):
+    book.resolve_market("cond", "yes", provisional=True)
+    book.confirm_resolution("cond", "yes")
+    assert book.balance == D("102")
+    rows = open(portfolio.TRADES_CSV).read().splitlines()[1:]
+    assert not any(",RESOLUTION_CORRECTION," in r for r in rows)
+
+
+@pytest.mark.parametrize("use_pandas", [True, False])
+def test_summary_nets_corrections(book, monkeypatch, use_pandas):
+    if not use_pandas:
+        monkeypatch.setattr(metrics, "pd", None)
+    book.resolve_market("cond", "yes", provisional=True)
+    book.confirm_resolution("cond", "no")
+
+    report = open(metrics.Metrics().write_daily_summary("rep", portfolio.TRADES_CSV)).read()
+    assert "| Total Trades | 2 |" in report
+    assert "| Wins | 1 |" in report
+    assert "| Losses | 1 |" in report
+    assert "| Total PnL | $2.0000 |" in report
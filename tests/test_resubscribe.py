@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import polymarket_client as pc
+
+
+class FakeWS:
+    closed = False
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, msg):
+        await asyncio.sleep(0.01)  # let a later rollover try to overtake
+        self.sent.append(json.loads(msg))
+
+    async def close(self):
+        self.closed = True
+
+
+def _client(ws):
+    client = pc.AsyncPMClient.__new__(pc.AsyncPMClient)
+    client._subscribed = frozenset(("a1", "a2"))
+    client._ob_cache = {}
+    client._ob_ws = ws
+    client._resub_task = None
+    return client
+
+
+def test_rollover_deltas_are_sent_in_order():
+    async def run():
+        ws = FakeWS()
+        client = _client(ws)
+        client._ob_ws_task = asyncio.create_task(asyncio.sleep(10))
+        client.start_orderbook_ws(["b1", "b2"])
+        client.start_orderbook_ws(["c1", "c2"])
+        await client._resub_task
+        client._ob_ws_task.cancel()
+        return ws.sent
+
+    sent = asyncio.run(run())
+    assert [(m["operation"], sorted(m["assets_ids"])) for m in sent] == [
+        ("unsubscribe", ["a1", "a2"]),
+        ("subscribe", ["b1", "b2"]),
+        ("unsubscribe", ["b1", "b2"]),
+        ("subscribe", ["c1", "c2"]),
+    ]
+
+
+def test_cancel_stops_queued_deltas():
+    async def run():
+        ws = FakeWS()
+        client = _client(ws)
+        client._ob_ws_task = asyncio.create_task(asyncio.sleep(10))
+        client.start_orderbook_ws(["b1", "b2"])
+        first = client._resub_task
+        client.start_orderbook_ws(["c1", "c2"])
+        client._resub_task.cancel()
+        await asyncio.gather(first, client._resub_task, return_exceptions=True)
+        client._ob_ws_task.cancel()
+        return first.cancelled(), ws.sent
+
+    first_cancelled, sent = asyncio.run(run())
+    assert first_cancelled
+    assert sent == []
@@ -0,0 +1,43 @@
+import asyncio
+
+import retry
+
+
+def _sleeps(monkeypatch):
+    waits = []
+
+    async def fake_sleep(wait):
+        waits.append(wait)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", fake_sleep)
+    return waits
+
+
+def test_full_jitter_bounds(monkeypatch):
+    waits = _sleeps(monkeypatch)
+    bounds = []
+
+    def fake_uniform(lo, hi):
+        bounds.append((lo, hi))
+        return hi
+
+    monkeypatch.setattr(retry.random, "uniform", fake_uniform)
+
+    async def run():
+        for attempt in (0, 3, 10):
+            assert await retry.retry_sleep(attempt, None)
+
+    asyncio.run(run())
+    assert bounds == [(0, 0.5), (0, 4.0), (0, retry.MAX_BACKOFF)]
+    assert waits == [0.5, 4.0, retry.MAX_BACKOFF]
+
+
+def test_server_wait_past_deadline_is_refused(monkeypatch):
+    waits = _sleeps(monkeypatch)
+
+    async def run():
+        now = asyncio.get_running_loop().time()
+        return await retry.retry_sleep(0, now + 1.0, server_wait=5.0)
+
+    assert asyncio.run(run()) is False
+    assert waits == []
@@ -0,0 +1,32 @@
+import strategy as st
+
+
+def _strategy():
+    return st.BTCStrategy(portfolio=None)
+
+
+def test_one_sample_per_slot_regardless_of_tick_rate():
+    s = _strategy()
+    for i in range(40):  # 0.1 s ticks over 4 s
+        s.get_trend(100.0 + i, 1000.0 + i * 0.1)
+    assert len(s.price_history) == 8
+
+
+def test_slow_ticks_back_fill_held_price():
+    s = _strategy()
+    s.get_trend(100.0, 1000.0)
+    s.get_trend(101.0, 1002.0)  # 2 s idle: three skipped slots
+    assert s.price_history == [100.0, 100.0, 100.0, 100.0, 101.0]
+    s.get_trend(102.0, 1002.5)
+    assert len(s.price_history) == 6
+
+
+def test_long_gap_fills_at_most_max_and_reanchors():
+    s = _strategy()
+    s.get_trend(100.0, 1000.0)
+    s.get_trend(105.0, 1060.3)
+    assert len(s.price_history) == 1 + st.MAX_FILL_SAMPLES + 1
+    s.get_trend(106.0, 1060.5)  # inside the re-anchored slot
+    assert len(s.price_history) == 1 + st.MAX_FILL_SAMPLES + 1
+    s.get_trend(107.0, 1060.8)
+    assert s.price_history[-1] == 107.0